@@ -0,0 +1,83 @@
+import numpy as np
+from scipy import special
+
+
+def standardize(values):
+    """
+    Centres a 1-D array and scales it to unit norm, so that the dot product of two standardized arrays is their Pearson
+    correlation coefficient. The arithmetic is done in float64 and the result is returned as a contiguous float32
+    array, which halves the memory read by the dot products that consume it.
+
+    Parameters:
+    :param values: A 1-D array-like of numeric values.
+
+    Returns:
+    :return: The standardized values as a contiguous float32 ndarray, all NaN if the input is constant or empty.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    centred = values - values.mean() if len(values) else values
+    norm = np.sqrt(np.dot(centred, centred))
+    return np.ascontiguousarray(centred * (1.0 / norm if norm > 0 else np.nan), dtype=np.float32)
+
+
+def pearson(x, y):
+    """
+    Calculates the Pearson correlation coefficient of two equal-length 1-D arrays as a single float32 dot product of
+    their standardized values, rather than through scipy's general-purpose pearsonr pipeline.
+
+    Parameters:
+    :param x: A 1-D array-like of numeric values.
+    :param y: A 1-D array-like of numeric values, the same length as x.
+
+    Returns:
+    :return: The correlation coefficient as a float, or NaN if either input is constant.
+    """
+    r = float(np.dot(standardize(x), standardize(y)))
+    if np.isnan(r):
+        return np.nan
+    # Rounding can push |r| slightly past 1
+    return max(min(r, 1.0), -1.0)
+
+
+def pearson_p_value(r, n):
+    """
+    Calculates the two-sided p-value for a Pearson correlation coefficient under the null hypothesis that the samples
+    are uncorrelated, using the same exact beta distribution as scipy.stats.pearsonr.
+
+    Parameters:
+    :param r: The correlation coefficient.
+    :param n: The number of paired samples the coefficient was calculated from.
+
+    Returns:
+    :return: The p-value as a float, or NaN if r is NaN.
+    """
+    if np.isnan(r):
+        return np.nan
+    if n == 2:
+        return 1.0
+
+    ab = n / 2 - 1
+    return float(min(1.0, 2 * special.betainc(ab, ab, 0.5 * (1 - abs(r)))))
+
+
+def spearman_p_value(r, n):
+    """
+    Calculates the two-sided p-value for a Spearman rank correlation coefficient using the t distribution with n - 2
+    degrees of freedom, as scipy.stats.spearmanr does.
+
+    Parameters:
+    :param r: The rank correlation coefficient.
+    :param n: The number of paired samples the coefficient was calculated from.
+
+    Returns:
+    :return: The p-value as a float, or NaN if r is NaN.
+    """
+    if np.isnan(r):
+        return np.nan
+
+    if abs(r) >= 1.0:
+        return 0.0
+
+    dof = n - 2
+    t = r * np.sqrt(dof / ((r + 1.0) * (1.0 - r)))
+    return float(2 * special.stdtr(dof, -abs(t)))
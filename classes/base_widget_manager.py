@@ -1,4 +1,6 @@
 import ipywidgets as widgets
+import re
+from collections import OrderedDict
 from datetime import datetime
 import pandas as pd
 from IPython.display import display, clear_output
@@ -8,8 +10,59 @@ from classes.data_processor import DataProcessor
 from classes.database_manager import DatabaseManager
 from classes.plotting_manager import PlottingManager
 
+# Applied once when the module is imported; every figure the notebook draws uses this style
+plt.style.use('fivethirtyeight')
+# Merge line segments that deviate by less than a pixel; large time series otherwise spend most of their draw time on
+# vertices that can't be seen
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+HOST_COLUMNS = ('*', 'host', 'jid', 'type', 'event', 'unit', 'value', 'diff', 'arc')
+HOST_COLUMNS_NO_STAR = HOST_COLUMNS[1:]
+HOST_ORDER_OPTIONS = ('None',) + HOST_COLUMNS_NO_STAR
+
+JOB_COLUMNS = ('*', 'jid', 'submit_time', 'start_time', 'end_time', 'runtime', 'timelimit', 'node_hrs', 'nhosts',
+               'ncores', 'ngpus', 'username', 'account', 'queue', 'state', 'jobname', 'exitcode', 'host_list')
+JOB_COLUMNS_NO_STAR = JOB_COLUMNS[1:]
+JOB_ORDER_OPTIONS = ('None',) + JOB_COLUMNS_NO_STAR
+
+_IN_VALUES_SPLIT = re.compile(r'\s*,\s*')
+
+
+def parse_in_values(text):
+    """
+    Splits the comma separated contents of an IN values textarea into a tuple of trimmed, non-empty values.
+    """
+    # An empty or blank textarea, the usual case, has no values to split
+    if not text or text.isspace():
+        return ()
+    return tuple(value for value in _IN_VALUES_SPLIT.split(text.strip()) if value)
+
 
 class BaseWidgetManager:
+    # Every attribute set by the init_* / initialize_* methods and group_and_display_widgets, so instances carry
+    # fixed slots instead of a per-instance __dict__
+    __slots__ = (
+        'data_processor', 'db_service', 'plotting_service',
+        'where_conditions_values', 'where_conditions_jobs', 'time_window_valid_jobs', 'MAX_DAYS_HOSTS', 'MAX_DAYS_JOBS',
+        'account_log_df', 'host_data_sql_query', 'where_conditions_hosts', 'time_window_valid_hosts', 'time_series_df',
+        'MAX_CACHED_PLOTS', '_plot_cache', '_display_plots_cache', 'parsed_in_values_hosts', 'parsed_in_values_jobs',
+        'query_cols_message', 'request_filters_message', 'current_filters_message', 'order_by_message', 'limit_message',
+        'in_values_message',
+        'error_output_hosts', 'output_hosts', 'query_output_hosts', 'banner_hosts_message', 'query_time_message_hosts',
+        'host_data_columns_dropdown', 'columns_dropdown_hosts', 'operators_dropdown_hosts', 'value_input_hosts',
+        'start_time_hosts', 'end_time_hosts', 'validate_button_hosts', 'execute_button_hosts',
+        'add_condition_button_hosts', 'remove_condition_button_hosts', 'condition_list_hosts', 'distinct_checkbox',
+        'order_by_dropdown', 'order_by_direction_dropdown', 'limit_input', 'in_values_dropdown', 'in_values_textarea',
+        'output_jobs', 'query_output_jobs', 'error_output_jobs', 'banner_jobs', 'query_time_message_jobs',
+        'job_data_columns_dropdown', 'data_filtering_cols_dropdown_jobs', 'operators_dropdown_jobs', 'value_input_jobs',
+        'start_time_jobs', 'end_time_jobs', 'validate_button_jobs', 'execute_button_jobs', 'add_condition_button_jobs',
+        'remove_condition_button_jobs', 'condition_list_jobs', 'distinct_checkbox_jobs', 'limit_input_jobs',
+        'order_by_dropdown_jobs', 'order_by_direction_dropdown_jobs', 'in_values_dropdown_jobs',
+        'in_values_textarea_jobs',
+        'stats', 'ratio_threshold', 'interval_type', 'time_units', 'time_value',
+        'value_input_container_hosts', 'condition_buttons', 'value_input_container_jobs', 'condition_buttons_jobs'
+    )
+
     def __init__(self):
         self.data_processor = DataProcessor(self)
         self.db_service = DatabaseManager()
@@ -32,6 +85,11 @@ class BaseWidgetManager:
         self.where_conditions_hosts = []
         self.time_window_valid_hosts = False
         self.time_series_df = pd.DataFrame()
+        self.MAX_CACHED_PLOTS = 4
+        self._plot_cache = OrderedDict()
+        self._display_plots_cache = {}
+        self.parsed_in_values_hosts = ()
+        self.parsed_in_values_jobs = ()
 
     def init_common_widgets(self):
         self.query_cols_message = widgets.HTML("<h4>Select columns:</h4>")
@@ -49,11 +107,11 @@ class BaseWidgetManager:
         self.query_time_message_hosts = widgets.HTML(
             f"<h4>Select start and end times (Max: <b>{self.MAX_DAYS_HOSTS}</b> days).</h4>")
         self.host_data_columns_dropdown = widgets.SelectMultiple(
-            options=['*', 'host', 'jid', 'type', 'event', 'unit', 'value', 'diff', 'arc'], value=['*'],
+            options=HOST_COLUMNS, value=['*'],
             description='Columns:'
         )
         self.columns_dropdown_hosts = widgets.Dropdown(
-            options=['host', 'jid', 'type', 'event', 'unit', 'value', 'diff', 'arc'],
+            options=HOST_COLUMNS_NO_STAR,
             description='Column:'
         )
         self.operators_dropdown_hosts = widgets.Dropdown(
@@ -92,7 +150,7 @@ class BaseWidgetManager:
             disabled=False
         )
         self.order_by_dropdown = widgets.Dropdown(
-            options=['None'] + [col for col in self.host_data_columns_dropdown.options if col != "*"],
+            options=HOST_ORDER_OPTIONS,
             value='None',
             description='Order By:'
         )
@@ -107,7 +165,7 @@ class BaseWidgetManager:
             disabled=False
         )
         self.in_values_dropdown = widgets.Dropdown(
-            options=['None'] + [col for col in self.host_data_columns_dropdown.options if col != "*"],
+            options=HOST_ORDER_OPTIONS,
             value='None',
             description='IN Column:'
         )
@@ -118,6 +176,8 @@ class BaseWidgetManager:
             description='IN values:',
             disabled=False
         )
+        # Parse the IN values once per edit rather than every time a query is constructed
+        self.in_values_textarea.observe(self.on_in_values_hosts_change, names='value')
 
     def initialize_job_data_widgets(self):
         self.output_jobs = widgets.Output()
@@ -127,16 +187,10 @@ class BaseWidgetManager:
         self.query_time_message_jobs = widgets.HTML(
             f"<h4>Select start and end times (Max: <b>{self.MAX_DAYS_JOBS}</b> days).</h4>")
         self.job_data_columns_dropdown = widgets.SelectMultiple(
-            options=['*', 'jid', 'submit_time', 'start_time', 'end_time', 'runtime', 'timelimit', 'node_hrs',
-                     'nhosts',
-                     'ncores', 'ngpus', 'username', 'account', 'queue', 'state', 'jobname', 'exitcode',
-                     'host_list'],
-            value=['*'], description='Columns:'
+            options=JOB_COLUMNS, value=['*'], description='Columns:'
         )
         self.data_filtering_cols_dropdown_jobs = widgets.Dropdown(
-            options=['jid', 'submit_time', 'start_time', 'end_time', 'runtime', 'timelimit', 'node_hrs', 'nhosts',
-                     'ncores',
-                     'ngpus', 'username', 'account', 'queue', 'state', 'jobname', 'exitcode', 'host_list'],
+            options=JOB_COLUMNS_NO_STAR,
             description='Column:'
         )
         self.operators_dropdown_jobs = widgets.Dropdown(
@@ -178,7 +232,7 @@ class BaseWidgetManager:
             disabled=False
         )
         self.order_by_dropdown_jobs = widgets.Dropdown(
-            options=['None'] + [col for col in self.job_data_columns_dropdown.options if col != "*"],
+            options=JOB_ORDER_OPTIONS,
             value='None',
             description='Order By:'
         )
@@ -188,7 +242,7 @@ class BaseWidgetManager:
             description='Direction:'
         )
         self.in_values_dropdown_jobs = widgets.Dropdown(
-            options=['None'] + [col for col in self.job_data_columns_dropdown.options if col != "*"],
+            options=JOB_ORDER_OPTIONS,
             value='None',
             description='IN Column:'
         )
@@ -199,13 +253,15 @@ class BaseWidgetManager:
             description='IN values:',
             disabled=False
         )
+        self.in_values_textarea_jobs.observe(self.on_in_values_jobs_change, names='value')
 
     def initialize_stats_widgets(self):
-        self.stats = widgets.SelectMultiple()
-        self.ratio_threshold = widgets.IntText()
-        self.interval_type = widgets.Dropdown()
-        self.time_units = widgets.Dropdown()
-        self.time_value = widgets.IntText()
+        # Built on first use by display_statistics_widgets, so no placeholder widgets are sent to the frontend
+        self.stats = None
+        self.ratio_threshold = None
+        self.interval_type = None
+        self.time_units = None
+        self.time_value = None
 
     def group_and_display_widgets(self):
         # Host Data stuff
@@ -323,43 +379,8 @@ class BaseWidgetManager:
                 disabled=True  # disabled by default
             )
 
-            def on_stats_change(change):
-                if change['type'] == 'change' and change['name'] == 'value':
-                    if "Ratio of Data Outside Threshold" in change['new']:
-                        # enable ratio_threshold if 'Ratio of Data Outside Threshold' is selected
-                        self.ratio_threshold.disabled = False
-                    else:
-                        # disable ratio_threshold if 'Ratio of Data Outside Threshold' is not selected
-                        self.ratio_threshold.disabled = True
-
-                    if change['new'][0] != "None":
-                        # enable interval_type if stats is not None
-                        self.interval_type.disabled = False
-                    else:
-                        # disable interval_type if stats is None
-                        self.interval_type.disabled = True
-                        self.interval_type.value = 'None'  # reset interval_type to 'None'
-
-            self.stats.observe(on_stats_change)
-
-            def on_interval_type_change(change):
-                if change['type'] == 'change' and change['name'] == 'value':
-                    if change['new'] == "None":
-                        self.time_units.disabled = True
-                        self.time_value.disabled = True
-                        self.time_units.value = 'None'  # reset time_units to 'None'
-                        self.time_value.value = 0  # reset time_value to 0
-                    elif change['new'] == "Time":
-                        self.time_units.disabled = False
-                        self.time_value.disabled = False
-                    elif change['new'] == "Count":
-                        self.time_units.disabled = True
-                        self.time_value.disabled = False
-                    else:
-                        self.time_units.disabled = False
-                        self.time_value.disabled = False
-
-            self.interval_type.observe(on_interval_type_change)
+            self.stats.observe(self.on_stats_change)
+            self.interval_type.observe(self.on_interval_type_change)
 
             # Display the widgets
             print("Please select a statistic to calculate.")
@@ -380,8 +401,67 @@ class BaseWidgetManager:
         except NameError:
             print("ERROR: Please make sure to run the previous notebook cell before executing this one.")
 
+    def on_stats_change(self, change):
+        if change['type'] == 'change' and change['name'] == 'value':
+            selected = set(change['new'])
+
+            # enable ratio_threshold only if 'Ratio of Data Outside Threshold' is selected
+            self.ratio_threshold.disabled = "Ratio of Data Outside Threshold" not in selected
+
+            if not selected or selected == {"None"}:
+                # disable interval_type if stats is None, sending both trait updates in one message
+                with self.interval_type.hold_sync():
+                    self.interval_type.disabled = True
+                    self.interval_type.value = 'None'  # reset interval_type to 'None'
+            else:
+                # enable interval_type if stats is not None
+                self.interval_type.disabled = False
+
+    def on_interval_type_change(self, change):
+        if change['type'] == 'change' and change['name'] == 'value':
+            if change['new'] == "None":
+                # Batch each widget's disabled/value updates into a single frontend message
+                with self.time_units.hold_sync(), self.time_value.hold_sync():
+                    self.time_units.disabled = True
+                    self.time_value.disabled = True
+                    self.time_units.value = 'None'  # reset time_units to 'None'
+                    self.time_value.value = 0  # reset time_value to 0
+            elif change['new'] == "Time":
+                self.time_units.disabled = False
+                self.time_value.disabled = False
+            elif change['new'] == "Count":
+                self.time_units.disabled = True
+                self.time_value.disabled = False
+            else:
+                self.time_units.disabled = False
+                self.time_value.disabled = False
+
+    def on_in_values_hosts_change(self, change):
+        self.parsed_in_values_hosts = parse_in_values(change['new'])
+
+    def on_in_values_jobs_change(self, change):
+        self.parsed_in_values_jobs = parse_in_values(change['new'])
+
     def display_plots(self):
+        if self.stats is None:
+            print("ERROR: Please make sure to run the previous notebook cells before executing this one.")
+            return
+
         try:
+            query_key = self.host_data_sql_query
+            if isinstance(query_key, tuple):
+                query_key = (query_key[0], tuple(query_key[1]))
+            key = (id(self.time_series_df), tuple(self.stats.value), self.interval_type.value, self.time_units.value,
+                   self.time_value.value, self.ratio_threshold.value, query_key)
+            self._drop_stale_plots()
+
+            # Re-display the plots from a previous render if neither the data nor the selections have changed
+            cached = self._plot_cache.get(key)
+            if cached is not None and cached[0] is self.time_series_df:
+                self._plot_cache.move_to_end(key)
+                display(cached[1])
+                return
+
             display_plots = DisplayPlots(
                 time_series_df=self.time_series_df,
                 data_processor=self.data_processor,
@@ -391,12 +471,28 @@ class BaseWidgetManager:
                 interval_type=self.interval_type,
                 time_value=self.time_value,
                 time_units=self.time_units,
-                ratio_threshold=self.ratio_threshold
+                ratio_threshold=self.ratio_threshold,
+                cache=self._display_plots_cache
             )
-            display_plots.display_plots()
+            tab = display_plots.display_plots()
+            if tab is not None:
+                self._plot_cache[key] = (self.time_series_df, tab)
+                if len(self._plot_cache) > self.MAX_CACHED_PLOTS:
+                    self._plot_cache.popitem(last=False)
         except NameError as e:
             print("ERROR: Please make sure to run the previous notebook cells before executing this one.")
 
+    def _drop_stale_plots(self):
+        """
+        Drops the cached plots and the DisplayPlots render cache of every time series other than the current one.
+        Those entries can never be used again once a new query has replaced time_series_df, and would otherwise keep the
+        old DataFrames, their time-indexed copies and their tabs in memory.
+        """
+        for key in [key for key, (source_df, _) in self._plot_cache.items() if source_df is not self.time_series_df]:
+            del self._plot_cache[key]
+        if self._display_plots_cache.get('source') is not self.time_series_df:
+            self._display_plots_cache.clear()
+
     def display_query_jobs(self):
         """
         Displays the current SQL query for jobs based on the specified conditions, columns, and time window.
@@ -458,27 +554,40 @@ class BaseWidgetManager:
 
     def pearson_correlation(self):
         try:
-            def on_selection_change(change):
-                if len(change.new) > 2:
-                    correlations.value = change.new[:2]
-
             def on_button_click(button):
-                graph_output.clear_output()
+                graph_output.clear_output(wait=True)
                 with graph_output:
-                    correlation_data = self.plotting_service.plot_correlation(correlations.value, self.time_series_df)
+                    correlation_data = self.plotting_service.plot_correlation((metric_one.value, metric_two.value),
+                                                                              self.time_series_df,
+                                                                              ax=ax, method=method.value)
                     # Added feedback based on the result of plot_correlation
                     if correlation_data is None:
                         print("Unable to calculate correlation for the selected metrics. Please check the data or "
                               "select different metrics.")
                     else:
-                        with plt.style.context('fivethirtyeight'):
-                            display(correlation_data)
+                        display(fig)
+
+            # One figure is redrawn on every click; it is detached from pyplot so the inline backend doesn't show it
+            # on its own
+            fig, ax = plt.subplots(figsize=(10, 6))
+            plt.close(fig)
+
+            metric_options = ['cpuuser', 'gpu_usage', 'nfs', 'block', 'memused', 'memused_minus_diskcache']
+            metric_one = widgets.Dropdown(
+                options=metric_options,
+                value=metric_options[0],
+                description='Metric One'
+            )
+            metric_two = widgets.Dropdown(
+                options=metric_options,
+                value=metric_options[1],
+                description='Metric Two'
+            )
 
-            correlations = widgets.SelectMultiple(
-                options=['None', 'cpuuser', 'gpu_usage', 'nfs', 'block', 'memused', 'memused_minus_diskcache'],
-                value=['None'],
-                description='Metrics',
-                disabled=False
+            method = widgets.Dropdown(
+                options=[('Pearson', 'pearson'), ('Spearman', 'spearman')],
+                value='pearson',
+                description='Method'
             )
 
             plot_button = widgets.Button(
@@ -488,26 +597,31 @@ class BaseWidgetManager:
             )
             plot_button.on_click(on_button_click)
 
+            # Keep the button disabled while both dropdowns name the same metric
+            widgets.dlink((metric_one, 'value'), (plot_button, 'disabled'), lambda value: value == metric_two.value)
+            widgets.dlink((metric_two, 'value'), (plot_button, 'disabled'), lambda value: value == metric_one.value)
+
             graph_output = widgets.Output()
 
             container = widgets.VBox(
-                [widgets.HBox([correlations, plot_button], layout=widgets.Layout(
+                [widgets.HBox([widgets.VBox([metric_one, metric_two, method]), plot_button], layout=widgets.Layout(
                     width="50%",
                     justify_content="space-between",
                     align_items="center"), ),
                  graph_output])
-            correlations.observe(on_selection_change, names='value')
 
             # Give the user the option to calculate correlations
-            print("Please select two metrics below to find their Pearson correlation:")
+            print("Please select two metrics and a method below to find their correlation:")
             display(container)
 
+            # Do the per-metric preparation now rather than inside the first button click
+            self.plotting_service.data_processor.prepare_correlation(self.time_series_df)
+
         except NameError:
             print("ERROR: Please make sure to run the previous notebook cells before executing this one.")
 
-    def conditionally_display_legend(self):
+    def conditionally_display_legend(self, ax=None):
         """
         This is a utility function to conditionally display the legend only if there are labeled data series.
         """
-        if len(plt.gca().get_legend_handles_labels()[0]) > 0:
-            plt.legend(loc='upper left', fontsize="10")
+        self.plotting_service.conditionally_display_legend(ax)
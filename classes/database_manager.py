@@ -1,31 +1,150 @@
+import atexit
+import datetime
+import io
+import numbers
 import os
-from typing import Optional
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, Optional
 import psycopg2
-from psycopg2 import OperationalError
+from psycopg2 import OperationalError, sql
+from psycopg2.pool import ThreadedConnectionPool
 import warnings
 import pandas as pd
-from tqdm.notebook import tqdm
+from tqdm.auto import tqdm
+
+# pd.read_sql warns on every call that it only supports SQLAlchemy connections; psycopg2 works fine, so silence it once
+warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy', category=UserWarning)
+
+
+# Casts numeric columns straight to float instead of building a Decimal for every value, which pandas would only
+# coerce back to float afterwards
+DEC2FLOAT = psycopg2.extensions.new_type(psycopg2.extensions.DECIMAL.values, 'DEC2FLOAT',
+                                         lambda value, curs: float(value) if value is not None else None)
+
+# PostgreSQL type codes of the float and numeric columns, which are always read into float64
+_FLOAT_TYPE_CODES = frozenset(psycopg2.extensions.FLOAT.values + psycopg2.extensions.DECIMAL.values)
+# PostgreSQL type codes of the text and timestamp columns, which COPY writes as plain text
+_STRING_TYPE_CODES = frozenset(psycopg2.STRING.values)
+_BOOLEAN_TYPE_CODES = frozenset(psycopg2.extensions.BOOLEAN.values)
+_DATE_TYPE_CODES = frozenset(psycopg2.extensions.DATE.values)
+_TIMESTAMP_TYPE_CODES = frozenset(psycopg2.extensions.PYDATETIME.values)
+_TIMESTAMPTZ_TYPE_CODES = frozenset(psycopg2.extensions.PYDATETIMETZ.values)
+# Column types whose COPY text output can be turned back into what pd.read_sql returns for them; results with any
+# other column type (intervals, arrays, JSON, ...) are fetched through pd.read_sql instead
+_COPY_TYPE_CODES = (_FLOAT_TYPE_CODES | _STRING_TYPE_CODES | _BOOLEAN_TYPE_CODES | _DATE_TYPE_CODES
+                    | _TIMESTAMP_TYPE_CODES | _TIMESTAMPTZ_TYPE_CODES
+                    | frozenset(psycopg2.extensions.INTEGER.values + psycopg2.extensions.LONGINTEGER.values))
+
+
+def _column_dtypes(description):
+    """
+    Maps the float and numeric columns of a cursor description to float64, so every chunk of a streamed result gets the
+    same dtype for them, even a chunk in which a column is entirely NULL and would otherwise be inferred as object.
+    """
+    return {column.name: 'float64' for column in description if column.type_code in _FLOAT_TYPE_CODES}
+
+
+def _is_range_value(value):
+    """
+    Returns whether a partition column value can be split into ranges, i.e. is a number (but not a bool), a date or a
+    timestamp.
+    """
+    return (isinstance(value, numbers.Real) and not isinstance(value, bool)) or isinstance(value, datetime.date)
+
+
+def _records_to_frame(rows, columns, dtypes=None):
+    """
+    Builds a DataFrame from a batch of fetched rows the way pd.read_sql does: Decimal values are coerced to floats and
+    timezone-aware datetime columns are converted to UTC. Columns listed in dtypes are cast to the given dtype.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    if dtypes:
+        frame = frame.astype(dtypes, copy=False)
+    for col in frame.select_dtypes(include=['datetimetz']).columns:
+        frame[col] = frame[col].dt.tz_convert('UTC')
+    return frame
 
 
 class DatabaseManager():
+    # Connection pool shared by every DatabaseManager instance, created on first use
+    _pool = None
+    POOL_MIN_CONNECTIONS = 1
+    POOL_MAX_CONNECTIONS = 4
+    # TCP keepalives stop idle pooled connections and long fetches from being dropped silently; sessions are read-only
+    # since the notebook only queries
+    CONNECTION_OPTIONS = {
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 5,
+        'application_name': 'fresco-notebook',
+        'options': '-c default_transaction_read_only=on',
+    }
+    MIN_FETCH_ROWS = 10000
+    PREFETCH_CHUNKS = 4
+    PROBE_CACHE_SIZE = 128
+    PROBE_CACHE_TTL = 300
+
     def __init__(self):
-        pass
+        # (query, params, exact_count) -> (time probed, row count) for recent row-count probes
+        self._probe_cache = {}
+
+    def clear_probe_cache(self):
+        """
+        Forgets every cached row-count probe, so the next chunked query counts or estimates its rows again.
+        """
+        self._probe_cache.clear()
 
-    def get_database_connection(self) -> Optional[psycopg2.extensions.connection]:
+    def _probe_rows(self, cur, query, params, exact_count):
         """
-        Establish a connection to a PostgreSQL database using credentials stored in environment variables.
+        Returns the exact or estimated number of rows the query will return. Results are cached for PROBE_CACHE_TTL
+        seconds per query and parameters, so re-running a recent query skips the probe.
 
-        This function retrieves database connection information from the environment variables
-        'DBHOST', 'DBPW', 'DBNAME', and 'DBUSER', and attempts to establish a connection to the
-        specified database. If any part of this process fails (e.g., a required environment
-        variable is missing or the database connection cannot be established), an error message
-        is printed and the function returns None.
+        Parameters:
+        :param cur: An open psycopg2 cursor.
+        :param query: A string containing the SQL query to be probed.
+        :param params: A list, tuple, or dict containing parameters to be passed to the SQL query, or None.
+        :param exact_count: If True, count the rows with SELECT COUNT(*); otherwise use the planner's estimate.
 
         Returns:
-        A psycopg2.extensions.connection object if the connection is successfully established;
-        otherwise, None.
+        :return: The number of rows as an integer.
         """
-        try:
+        if isinstance(params, dict):
+            key_params = tuple(sorted(params.items()))
+        else:
+            key_params = tuple(params or ())
+        key = (query, key_params, exact_count)
+
+        now = time.monotonic()
+        cached = self._probe_cache.get(key)
+        if cached is not None and now - cached[0] < self.PROBE_CACHE_TTL:
+            return cached[1]
+
+        if exact_count:
+            cur.execute(f"SELECT COUNT(*) FROM ({query}) as sub_query", params)
+            total_rows = cur.fetchone()[0]
+        else:
+            total_rows = self._estimate_rows(cur, query, params)
+
+        # Evict the oldest entry once the cache is full
+        self._probe_cache.pop(key, None)
+        if len(self._probe_cache) >= self.PROBE_CACHE_SIZE:
+            del self._probe_cache[next(iter(self._probe_cache))]
+        self._probe_cache[key] = (now, total_rows)
+        return total_rows
+
+    @classmethod
+    def _get_pool(cls) -> ThreadedConnectionPool:
+        """
+        Returns the shared connection pool, creating it from the credentials in the environment variables 'DBHOST',
+        'DBPW', 'DBNAME', and 'DBUSER' the first time it is needed. The pool is closed when the interpreter exits.
+        """
+        if cls._pool is None:
             # Get the database credentials from the environment variables
             db_host = os.getenv('DBHOST')
             db_password = os.getenv('DBPW')
@@ -35,15 +154,64 @@ class DatabaseManager():
             if not all([db_host, db_password, db_name, db_user]):
                 raise ValueError('One or more database credentials are missing from the environment variables.')
 
-            # Establish a connection to the database
-            connection = psycopg2.connect(host=db_host, dbname=db_name, user=db_user, password=db_password)
-            return connection
+            cls._pool = ThreadedConnectionPool(cls.POOL_MIN_CONNECTIONS, cls.POOL_MAX_CONNECTIONS, host=db_host,
+                                               dbname=db_name, user=db_user, password=db_password,
+                                               **cls.CONNECTION_OPTIONS)
+        return cls._pool
+
+    @classmethod
+    def close_pool(cls):
+        """
+        Closes every connection in the shared pool, e.g. when tearing down the notebook. A new pool is created from the
+        environment variables the next time a connection is needed.
+        """
+        if cls._pool is not None:
+            pool, cls._pool = cls._pool, None
+            pool.closeall()
+
+    @contextmanager
+    def get_database_connection(self, autocommit=False) -> Iterator[Optional[psycopg2.extensions.connection]]:
+        """
+        Borrow a connection to a PostgreSQL database from a pool shared by all DatabaseManager instances, so repeated
+        queries reuse an open session instead of paying for a new connection and authentication handshake each time.
+
+        The pool is created from the environment variables 'DBHOST', 'DBPW', 'DBNAME', and 'DBUSER' on first use. If
+        any part of this process fails (e.g., a required environment variable is missing or the database connection
+        cannot be established), an error message is printed and None is yielded. Numeric columns are read as floats
+        rather than Decimals. On exit the transaction is committed, or rolled back if an exception (including a
+        KeyboardInterrupt) was raised, and the connection is always returned to the pool.
+
+        Parameters:
+        :param autocommit: Optional. Run each statement in its own implicit transaction, which saves the BEGIN and
+                           COMMIT round trips for one-shot queries and holds no transaction open between statements.
+                           Must stay False for server-side (named) cursors, which only live inside a transaction.
 
+        Returns:
+        A context manager yielding a psycopg2.extensions.connection object if a connection is available; otherwise,
+        None.
+        """
+        try:
+            pool = self._get_pool()
+            connection = pool.getconn()
         except (Exception, OperationalError) as error:
             print(f"An error occurred: {error}")
-            return None
+            yield None
+            return
 
-    def execute_sql_query(self, query, incoming_df, params=None):
+        try:
+            psycopg2.extensions.register_type(DEC2FLOAT, connection)
+            connection.autocommit = autocommit
+            yield connection
+            connection.commit()
+        except BaseException:
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            # Discard connections the server has dropped instead of handing them out again
+            pool.putconn(connection, close=bool(connection.closed))
+
+    def execute_sql_query(self, query, incoming_df, params=None, backend='read_sql'):
         """
         Executes the provided SQL query using the given database connection and parameters, and returns the result as a
         pandas DataFrame.
@@ -53,26 +221,171 @@ class DatabaseManager():
         :param incoming_df: A pandas DataFrame in which the results of the SQL query will be stored.
         :param params: Optional. A list, tuple, or dict containing parameters to be passed to the SQL query. This is used
                        to handle parameterized queries safely.
+        :param backend: Optional. 'read_sql' (the default) fetches the rows through pd.read_sql; 'copy' streams the
+                        result with COPY ... TO STDOUT and parses it with pandas' CSV reader, which is faster for large
+                        results.
 
         Returns:
         :return: A pandas DataFrame containing the results of the executed SQL query. If there's an error in execution or
                  establishing a database connection, the function may return None.
         """
         try:
-            with self.get_database_connection() as conn:
+            with self.get_database_connection(autocommit=True) as conn:
                 if conn is None:
                     print("Failed to establish a database connection.")
                     return
 
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
+                if backend == 'copy':
+                    incoming_df = self._copy_query(conn, query, params)
+                else:
                     incoming_df = pd.read_sql(query, conn, params=params)
 
                 return incoming_df
         except Exception as e:
             print(f"An error occurred: {e}")
 
-    def execute_sql_query_chunked(self, query, incoming_df, params=None, target_num_chunks=25000):
+    def _copy_query(self, conn, query, params=None):
+        """
+        Fetches a query's result with COPY ... TO STDOUT in CSV format and parses it with pandas' C CSV reader, which
+        avoids building a Python tuple for every row. COPY output is untyped, so the column types are first read from an
+        empty run of the query and used to restore what pd.read_sql would give: NULLs as missing values (None in object
+        columns), float/numeric columns as float64, booleans as bools, dates as datetime.date objects and timestamps as
+        datetime64, with timezone-aware ones in UTC. Results with a column type that can't be restored this way are
+        fetched with pd.read_sql instead.
+
+        Parameters:
+        :param conn: An open psycopg2 connection.
+        :param query: A string containing the SQL query to be executed.
+        :param params: Optional. A list, tuple, or dict containing parameters to be passed to the SQL query.
+
+        Returns:
+        :return: A pandas DataFrame containing the results of the query.
+        """
+        with conn.cursor() as cur:
+            bound = cur.mogrify(query, params).rstrip().rstrip(b';')
+            cur.execute(b"SELECT * FROM (" + bound + b") AS q LIMIT 0")
+            description = cur.description
+
+            buffer = None
+            if all(column.type_code in _COPY_TYPE_CODES for column in description):
+                # A fresh random NULL marker can't be confused with an empty string or any text in the result, not
+                # even 'NA', 'null' or a literal \N
+                null_marker = uuid.uuid4().hex
+                buffer = io.BytesIO()
+                cur.copy_expert(b"COPY (" + bound + b") TO STDOUT WITH (FORMAT csv, HEADER, NULL '"
+                                + null_marker.encode() + b"')", buffer)
+
+        if buffer is None:
+            return pd.read_sql(query, conn, params=params)
+        buffer.seek(0)
+
+        dtypes = _column_dtypes(description)
+        dtypes.update({column.name: 'object' for column in description
+                       if column.type_code in _STRING_TYPE_CODES | _BOOLEAN_TYPE_CODES | _DATE_TYPE_CODES})
+        # Only the NULL marker is missing; pandas' default NA strings are ordinary text here
+        frame = pd.read_csv(buffer, dtype=dtypes, keep_default_na=False, na_values=[null_marker])
+
+        for column in description:
+            name, type_code = column.name, column.type_code
+            if type_code in _TIMESTAMP_TYPE_CODES:
+                frame[name] = pd.to_datetime(frame[name], format='ISO8601')
+            elif type_code in _TIMESTAMPTZ_TYPE_CODES:
+                frame[name] = pd.to_datetime(frame[name], format='ISO8601', utc=True)
+            elif type_code in _BOOLEAN_TYPE_CODES:
+                frame[name] = frame[name].map({'t': True, 'f': False})
+            elif type_code in _DATE_TYPE_CODES:
+                dates = pd.to_datetime(frame[name], format='ISO8601')
+                frame[name] = dates.dt.date.where(dates.notna(), None)
+
+            if frame[name].dtype == object and frame[name].hasnans:
+                frame[name] = frame[name].where(frame[name].notna(), None)
+        return frame
+
+    def _estimate_rows(self, cur, query, params=None):
+        """
+        Estimates the number of rows the query will return from the planner's EXPLAIN output, without executing it.
+
+        Parameters:
+        :param cur: An open psycopg2 cursor.
+        :param query: A string containing the SQL query to be estimated.
+        :param params: Optional. A list, tuple, or dict containing parameters to be passed to the SQL query.
+
+        Returns:
+        :return: The planner's estimated row count as an integer.
+        """
+        cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+        return int(cur.fetchone()[0][0]['Plan']['Plan Rows'])
+
+    def _stream_query(self, conn, query, params, chunksize, pbar=None):
+        """
+        Runs the query on a server-side cursor and fetches the result chunksize rows at a time, so only a few chunks are
+        held client-side at a time, rather than psycopg2 buffering the whole result set before pandas slices it. The
+        fetches run in a background thread that stays up to PREFETCH_CHUNKS chunks ahead, so the next round trip to the
+        server overlaps with building the DataFrame for the current chunk.
+
+        Parameters:
+        :param conn: An open psycopg2 connection.
+        :param query: A string containing the SQL query to be executed.
+        :param params: A list, tuple, or dict containing parameters to be passed to the SQL query, or None.
+        :param chunksize: The number of rows to fetch per round trip.
+        :param pbar: Optional. A tqdm progress bar to advance by the number of rows in each chunk.
+
+        Returns:
+        :return: A pandas DataFrame containing all fetched rows.
+        """
+        chunks = []
+        columns = None
+        dtypes = None
+        batches = queue.Queue(maxsize=self.PREFETCH_CHUNKS)
+        stop = threading.Event()
+
+        def fetch_batches(stream_cur):
+            try:
+                while not stop.is_set():
+                    rows = stream_cur.fetchmany(chunksize)
+                    batches.put(rows)
+                    if not rows:
+                        break
+            except Exception as error:
+                batches.put(error)
+
+        with conn.cursor(name=f"fresco_stream_{id(self)}") as stream_cur:
+            stream_cur.itersize = chunksize
+            stream_cur.execute(query, params)
+
+            fetcher = threading.Thread(target=fetch_batches, args=(stream_cur,), daemon=True)
+            fetcher.start()
+            try:
+                while True:
+                    rows = batches.get()
+                    if isinstance(rows, Exception):
+                        raise rows
+                    if columns is None:
+                        columns = [column.name for column in stream_cur.description]
+                        dtypes = _column_dtypes(stream_cur.description)
+                    if not rows:
+                        break
+                    chunk = _records_to_frame(rows, columns, dtypes)
+                    chunks.append(chunk)
+                    if pbar is not None:
+                        pbar.update(len(chunk))
+            finally:
+                # Let the fetcher finish before the cursor is closed, unblocking it if we stopped early
+                stop.set()
+                while fetcher.is_alive():
+                    try:
+                        batches.get_nowait()
+                    except queue.Empty:
+                        fetcher.join(0.05)
+
+        if not chunks:
+            return pd.DataFrame(columns=columns).astype(dtypes or {})
+        # A result that fit in one fetch is returned as-is rather than copied by concat
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True, copy=False)
+
+    def execute_sql_query_chunked(self, query, incoming_df, params=None, target_num_chunks=25000, exact_count=False):
         """
         Executes the provided SQL query in chunks using the given database connection and parameters,
         and returns the combined result as a pandas DataFrame. This function is optimized for fetching
@@ -86,7 +399,10 @@ class DatabaseManager():
                        This is used to handle parameterized queries safely.
         :param target_num_chunks: Optional. An integer that specifies the target number of chunks the dataset should
                                   be broken into. Default is 25000. The actual chunk size is determined by dividing
-                                  the total number of rows by this value.
+                                  the total number of rows by this value, but is never less than MIN_FETCH_ROWS.
+        :param exact_count: Optional. If True, the total number of rows is counted exactly with SELECT COUNT(*), which
+                            runs the query an extra time. By default the planner's row estimate from EXPLAIN is used,
+                            which only sizes the chunks and the progress bar.
 
         Returns:
         :return: A pandas DataFrame containing the results of the executed SQL query combined from all chunks.
@@ -101,25 +417,101 @@ class DatabaseManager():
                 # Create a cursor object
                 with conn.cursor() as cur:
                     # Calculate total rows and chunk size
-                    cur.execute(f"SELECT COUNT(*) FROM ({query}) as sub_query", params)
-                    total_rows = cur.fetchone()[0]
+                    total_rows = self._probe_rows(cur, query, params, exact_count)
 
                     chunksize = total_rows // target_num_chunks if total_rows > target_num_chunks else total_rows
+                    # Each fetch from the server-side cursor is a round trip, so never fetch fewer than
+                    # MIN_FETCH_ROWS rows at a time
+                    chunksize = max(chunksize, self.MIN_FETCH_ROWS)
 
                     # Fetch data with a progress bar
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        pbar = tqdm(total=total_rows,
-                                    desc="Fetching rows",
-                                    bar_format='{desc}: {percentage:.1f}%|{bar}| {n}/{total} [Elapsed: {elapsed} | '
-                                               'Remaining: {remaining} | {rate_fmt}{postfix}]')
-
-                        chunks = []
-                        for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
-                            chunks.append(chunk)
-                            pbar.update(len(chunk))
+                    pbar = tqdm(total=total_rows,
+                                desc="Fetching rows",
+                                mininterval=0.5,
+                                miniters=max(1, total_rows // 500),
+                                bar_format='{desc}: {percentage:.1f}%|{bar}| {n}/{total} [Elapsed: {elapsed} | '
+                                           'Remaining: {remaining} | {rate_fmt}{postfix}]')
+
+                    result = self._stream_query(conn, query, params, chunksize, pbar)
 
+                    # The estimate is rarely exact, so finish the bar on the number of rows actually fetched
+                    pbar.total = pbar.n
+                    pbar.refresh()
                     pbar.close()
-                    return pd.concat(chunks, ignore_index=True)
+                    return result
         except Exception as e:
             print(f"An error occurred: {e}")
+
+    def execute_sql_query_partitioned(self, query, partition_on, params=None, n_parts=None):
+        """
+        Executes the provided SQL query as several range partitions fetched concurrently over separate pooled
+        connections, and returns the combined result as a pandas DataFrame. The range of the partition column is read
+        first, split into n_parts equal ranges, and each range is streamed through its own server-side cursor in a worker
+        thread; psycopg2 releases the GIL while waiting on the network, so the fetches overlap.
+
+        Parameters:
+        :param query: A string containing the SQL query to be executed.
+        :param partition_on: The name of a numeric, date or timestamp column of the query result to partition on, ideally
+                             an indexed column such as 'time'. Text columns such as 'jid' can't be split into ranges.
+                             Rows where the column is NULL are fetched with the first partition.
+        :param params: Optional. A list or tuple containing parameters to be passed to the SQL query.
+        :param n_parts: Optional. The number of partitions to split the query into. Defaults to POOL_MAX_CONNECTIONS,
+                        and at most POOL_MAX_CONNECTIONS partitions are fetched at once.
+
+        Returns:
+        :return: A pandas DataFrame containing the results of the executed SQL query, ordered by partition. If there's an
+                 error in execution or establishing a database connection, the function may return None.
+        """
+        n_parts = n_parts or self.POOL_MAX_CONNECTIONS
+        params = list(params or ())
+
+        try:
+            with self.get_database_connection(autocommit=True) as conn:
+                if conn is None:
+                    print("Failed to establish a database connection.")
+                    return
+
+                column = sql.Identifier(partition_on).as_string(conn)
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT MIN({column}), MAX({column}) FROM ({query}) as sub_query", params)
+                    low, high = cur.fetchone()
+
+            if low is None:
+                # Nothing to partition, so fetch the result directly (it is empty or entirely NULL in the column)
+                return self.execute_sql_query_chunked(query, None, params)
+            if not _is_range_value(low) or not _is_range_value(high):
+                raise ValueError(f"Cannot partition on '{partition_on}': it must be a numeric, date or timestamp column, "
+                                 f"not {type(low).__name__}.")
+
+            # Split [low, high] into equal ranges; the last range also includes high itself
+            bounds = [low + (high - low) * i / n_parts for i in range(n_parts)] + [high]
+            partitions = []
+            for i in range(n_parts):
+                upper = "<=" if i == n_parts - 1 else "<"
+                # NULLs fall in no range, so the first partition picks them up
+                null_rows = f" OR {column} IS NULL" if i == 0 else ""
+                partitions.append((f"SELECT * FROM ({query}) as partition_query "
+                                   f"WHERE ({column} >= %s AND {column} {upper} %s){null_rows}",
+                                   params + [bounds[i], bounds[i + 1]]))
+
+            pbar = tqdm(desc="Fetching rows",
+                        mininterval=0.5,
+                        bar_format='{desc}: {n} rows [Elapsed: {elapsed} | {rate_fmt}{postfix}]')
+
+            def fetch_partition(partition):
+                with self.get_database_connection() as part_conn:
+                    if part_conn is None:
+                        raise RuntimeError("Failed to establish a database connection.")
+                    return self._stream_query(part_conn, *partition, self.MIN_FETCH_ROWS, pbar)
+
+            try:
+                with ThreadPoolExecutor(max_workers=min(n_parts, self.POOL_MAX_CONNECTIONS)) as executor:
+                    frames = list(executor.map(fetch_partition, partitions))
+            finally:
+                pbar.close()
+            return pd.concat(frames, ignore_index=True, copy=False)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+
+atexit.register(DatabaseManager.close_pool)
@@ -1,32 +1,103 @@
-import warnings
-import seaborn as sns
 from classes.data_processor import DataProcessor
 from matplotlib import pyplot as plt
+import numpy as np
 import pandas as pd
 
+# Fixed legend placement. Never use 'best' here: it searches every plotted vertex for the least crowded corner.
+_LEGEND_LOC = 'upper left'
+
+# Number of grid points the binned kernel density estimate is evaluated on
+_KDE_GRID_SIZE = 512
+# Larger samples are drawn as this many evenly spaced ranks of the ECDF; the omitted steps are far below a pixel high
+_ECDF_MAX_POINTS = 100000
+
+
+def _histogram(ts_df):
+    """
+    Bins the non-missing values of a time series with NumPy's 'auto' bin selection, as seaborn's histplot does.
+
+    Parameters:
+    :param ts_df: A pandas DataFrame that contains a column 'value'.
+
+    Returns:
+    :return: A tuple of (values, counts, edges), where values is a float ndarray with the NaNs removed.
+    """
+    values = _clean(ts_df)
+    counts, edges = np.histogram(values, bins='auto')
+    return values, counts, edges
+
+
+def _binned_kde(values):
+    """
+    Estimates the probability density of a sample with a Gaussian kernel and Scott's bandwidth, restricted to the range
+    of the data. The sample is first binned onto a fixed grid and the grid is convolved with the kernel, which costs
+    O(N) for the binning instead of the O(N * grid) of evaluating every kernel at every grid point.
+
+    Parameters:
+    :param values: A 1-D float ndarray without NaNs.
+
+    Returns:
+    :return: A tuple of (grid, density), or None if the sample is too small or has no spread.
+    """
+    n = values.size
+    std = values.std(ddof=1) if n > 1 else 0.0
+    if not std > 0:
+        return None
+
+    counts, edges = np.histogram(values, bins=_KDE_GRID_SIZE)
+    grid = (edges[:-1] + edges[1:]) / 2
+    dx = edges[1] - edges[0]
+    bandwidth = std * n ** (-1 / 5)
+
+    # Kernel sampled at the grid spacing out to four bandwidths. No two grid points are more than the grid's length
+    # apart, so a wider kernel (a small sample with a wide bandwidth) can be cut there without losing any mass
+    half_width = min(int(np.ceil(4 * bandwidth / dx)), _KDE_GRID_SIZE - 1)
+    offsets = np.arange(-half_width, half_width + 1) * dx
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    # The full convolution is centred on the grid half_width bins in, whatever the kernel's length
+    density = np.convolve(counts, kernel, mode='full')[half_width:half_width + _KDE_GRID_SIZE] / n
+    return grid, density
+
+
+def _clean(df):
+    """
+    Returns the non-missing values of a DataFrame's 'value' column as a float ndarray, leaving the DataFrame untouched.
+    """
+    values = df['value'].to_numpy(dtype=float, na_value=np.nan)
+    return values[~np.isnan(values)]
+
 
 class PlottingManager:
     def __init__(self, base_widget_manager):
         self.data_processor = DataProcessor(base_widget_manager)
 
-    def conditionally_display_legend(self):
+    def conditionally_display_legend(self, ax=None):
         """
         This is a utility function to conditionally display the legend only if there are labeled data series.
+
+        Parameters:
+        :param ax: The Axes to add the legend to. Defaults to the current pyplot Axes.
         """
-        if len(plt.gca().get_legend_handles_labels()[0]) > 0:
-            plt.legend(loc='upper left', fontsize="10")
+        if ax is None:
+            ax = plt.gca()
+        handles, _ = ax.get_legend_handles_labels()
+        if handles:
+            ax.legend(loc=_LEGEND_LOC, fontsize=10)
 
-    def plot_correlation(self, correlations, ts_df):
+    def plot_correlation(self, correlations, ts_df, ax=None, method='pearson'):
         """
-        Plot the Pearson Correlation Coefficient.
+        Plot the Pearson or Spearman Correlation Coefficient.
 
         Parameters:
-        correlation_data: A dictionary containing the Pearson Correlation Coefficient and p-value.
+        correlations: A tuple of the two metrics to correlate.
+        ts_df: A pandas DataFrame that contains 'event' and 'value' columns.
+        ax: An optional Axes to redraw into. If omitted, a new figure is created and shown.
+        method: 'pearson' or 'spearman'.
 
         Returns:
-        None
+        A dictionary containing the Pearson Correlation Coefficient and p-value, or None if there was no data to plot.
         """
-        correlation_data = self.data_processor.calculate_correlation(ts_df, correlations)
+        correlation_data = self.data_processor.calculate_correlation(ts_df, correlations, method=method)
 
         if correlation_data is None:
             print("No data to plot.")
@@ -37,19 +108,26 @@ class PlottingManager:
         metric_one = correlation_data['Metric One']
         metric_two = correlation_data['Metric Two']
 
+        show = ax is None
+        if show:
+            _, ax = plt.subplots(figsize=(10, 6))
+        else:
+            ax.clear()
+
         # Create scatter plot
-        plt.figure(figsize=(10, 6))
-        plt.scatter(metric_one, metric_two)
-        plt.xlabel(metric_one)
-        plt.ylabel(metric_two)
-        plt.title(f'Scatter plot of {metric_one} and {metric_two}')
+        ax.scatter(metric_one, metric_two)
+        ax.set_xlabel(metric_one)
+        ax.set_ylabel(metric_two)
+        ax.set_title(f'Scatter plot of {metric_one} and {metric_two}')
 
         # Add text box with the correlation and p-value
         text_str = f'Correlation: {correlation:.10f}\nP-value: {p_val:.10f}'
-        plt.text(0.05, 0.95, text_str, transform=plt.gca().transAxes, fontsize=14,
-                 verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+        ax.text(0.05, 0.95, text_str, transform=ax.transAxes, fontsize=14,
+                verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
 
-        plt.show()
+        if show:
+            plt.show()
+        return correlation_data
 
     def plot_data_points_outside_threshold(self, ratio_threshold_value, ts_df: pd.DataFrame):
         """
@@ -67,9 +145,10 @@ class PlottingManager:
         """
         threshold = ratio_threshold_value
 
-        # Here we calculate the ratio of data outside the threshold
-        num_data_points = len(ts_df['value'])
-        num_outside_threshold = sum(abs(ts_df['value']) > threshold)
+        # Here we calculate the ratio of data outside the threshold in a single vectorised pass
+        values = ts_df['value'].to_numpy(dtype=float, na_value=np.nan)
+        num_data_points = values.size
+        num_outside_threshold = np.count_nonzero(np.abs(values) > threshold)
 
         ratio_outside_threshold = num_outside_threshold / num_data_points
 
@@ -88,17 +167,25 @@ class PlottingManager:
                       data for which the CDF will be calculated and plotted.
 
         Returns:
-        :return: This function does not return anything. Instead, it creates a step plot using seaborn's histplot function,
-                 with the cumulative option set to True. The x-axis of the plot represents the 'value' column from the
-                 input DataFrame, and the y-axis represents the cumulative frequency. The title of the plot is
-                 'Cumulative Distribution Function (CDF)'.
+        :return: This function does not return anything. Instead, it creates a step plot of the empirical CDF, taken
+                 from the sorted values rather than from histogram bins. The x-axis of the plot represents the 'value'
+                 column from the input DataFrame, and the y-axis represents the proportion of values less than or
+                 equal to x. The title of the plot is 'Cumulative Distribution Function (CDF)'.
         """
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=FutureWarning)
-            time_series_df = ts_df.dropna()
-            sns.histplot(time_series_df['value'], cumulative=True, element="step", fill=False)
-            plt.title('Cumulative Distribution Function (CDF)')
-            plt.show()
+        values = np.sort(_clean(ts_df))
+        n = values.size
+        proportions = np.arange(1, n + 1) / n
+        if n > _ECDF_MAX_POINTS:
+            # Sorted order keeps the subsample monotonic; always keep the last point so the curve reaches 1
+            ranks = np.linspace(0, n - 1, _ECDF_MAX_POINTS).astype(np.int64)
+            values, proportions = values[ranks], proportions[ranks]
+
+        ax = plt.gca()
+        ax.step(values, proportions, where='post')
+        ax.set_xlabel('value')
+        ax.set_ylabel('Proportion')
+        plt.title('Cumulative Distribution Function (CDF)')
+        plt.show()
 
     def plot_pdf(self, ts_df: pd.DataFrame):
         """
@@ -110,16 +197,25 @@ class PlottingManager:
 
         Returns:
         :return: This function does not return anything. Instead, it creates a histogram and overlaid kernel density
-                 estimate plot using seaborn's histplot function. The x-axis of the plot represents the 'value' column
-                 from the input DataFrame, and the y-axis represents the estimated probability density. The title of
-                 the plot is 'Probability Density Function (PDF)'.
+                 estimate plot, both binned with NumPy. The x-axis of the plot represents the 'value' column from the
+                 input DataFrame, and the y-axis represents the estimated probability density, scaled to the histogram
+                 counts. The title of the plot is 'Probability Density Function (PDF)'.
         """
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=FutureWarning)
-            time_series_df = ts_df.dropna()
-            sns.histplot(time_series_df['value'], kde=True)
-            plt.title('Probability Density Function (PDF)')
-            plt.show()
+        values, counts, edges = _histogram(ts_df)
+        ax = plt.gca()
+        artist = ax.stairs(counts, edges, fill=True, alpha=0.5)
+        ax.stairs(counts, edges, color=artist.get_facecolor(), alpha=1)
+
+        kde = _binned_kde(values)
+        if kde is not None:
+            grid, density = kde
+            # Scale the density to the histogram's counts, as seaborn's histplot does
+            ax.plot(grid, density * values.size * np.diff(edges).mean(), color=artist.get_facecolor(), alpha=1)
+
+        ax.set_xlabel('value')
+        ax.set_ylabel('Count')
+        plt.title('Probability Density Function (PDF)')
+        plt.show()
 
     def plot_box_and_whisker(self, df_mean: pd.DataFrame, df_std: pd.DataFrame, df_median: pd.DataFrame):
         """
@@ -137,23 +233,20 @@ class PlottingManager:
                  upper quartile values of the data, with a line at the median. The whiskers extend from the box to show
                  the range of the data. Outlier points are those past the end of the whiskers.
         """
-        # Collect statistics into a list of pandas Series or numpy arrays
+        # Collect statistics into a list of numpy arrays, without modifying the caller's DataFrames
         all_data = []
         labels = []
         color_choices = []
         if df_mean is not None:
-            df_mean.dropna(subset=['value'], inplace=True)
-            all_data.append(df_mean['value'])
+            all_data.append(_clean(df_mean))
             labels.append('Mean')
             color_choices.append('pink')
         if df_median is not None:
-            df_median.dropna(subset=['value'], inplace=True)
-            all_data.append(df_median['value'])
+            all_data.append(_clean(df_median))
             labels.append('Median')
             color_choices.append('lightgreen')
         if df_std is not None:
-            df_std.dropna(subset=['value'], inplace=True)
-            all_data.append(df_std['value'])
+            all_data.append(_clean(df_std))
             labels.append('Standard Deviation')
             color_choices.append('lightyellow')
 
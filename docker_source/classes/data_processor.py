@@ -1,14 +1,208 @@
-from scipy.stats import pearsonr
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import zipfile
 import re
 import io
 import os
+from scipy.stats import rankdata
+from classes._corr_kernels import pearson, pearson_p_value, spearman_p_value, standardize
+
+
+MAPPED_UNITS = {
+    "CPU %": "cpuuser",
+    "GPU %": "gpu_usage",
+    "GB:memused": "memused",
+    "GB:memused_minus_diskcache": "memused_minus_diskcache",
+    "GB/s": "block",
+    "MB/s": "nfs"
+}
+_UNIT_KEYS = tuple(MAPPED_UNITS)
+_UNIT_VALUE_TO_KEY = {value: key for key, value in MAPPED_UNITS.items()}
+_VALID_UNITS = frozenset(MAPPED_UNITS)
+_VALID_EVENTS = frozenset(MAPPED_UNITS.values())
+
+
+
+def _token_list_re(prefix):
+    """
+    Compiles a pattern matching a whole comma-separated list of '<prefix><digits>' tokens, ignoring case and the
+    whitespace around each token. Matching is ASCII-only, so digits and case folding use plain byte-range checks
+    instead of Unicode property lookups.
+    """
+    return re.compile(rf'\s*{prefix}[0-9]+\s*(?:,\s*{prefix}[0-9]+\s*)*\Z', re.IGNORECASE | re.ASCII)
+
+
+# Validator patterns, compiled once at import
+_JID_LIST_RE = _token_list_re('JOB')
+_GROUP_LIST_RE = _token_list_re('GROUP')
+_USER_LIST_RE = _token_list_re('USER')
+_NODE_LIST_RE = _token_list_re('NODE')
+_JOBNAME_LIST_RE = _token_list_re('JOBNAME')
+_SPECIAL_CHARS_RE = re.compile(r'[^a-zA-Z0-9,]')
+# Deletes every ASCII character that _SPECIAL_CHARS_RE would remove
+_SPECIAL_CHARS_TABLE = str.maketrans('', '', ''.join(chr(c) for c in range(128) if _SPECIAL_CHARS_RE.match(chr(c))))
+
+
+@lru_cache(maxsize=128)
+def _build_select_query(table_name, selected_columns, distinct, conditions, params, in_column, in_values, order_by,
+                        order_direction, limit):
+    """
+    Builds a SELECT query from hashable widget state. Results are memoized so that re-rendering the query for an
+    unchanged widget state is a dictionary lookup instead of a full rebuild.
+
+    Parameters:
+    :param table_name: The name of the table to select from.
+    :param selected_columns: A tuple of column names to select.
+    :param distinct: A boolean indicating whether to use SELECT DISTINCT.
+    :param conditions: A tuple of (column, operator, placeholder) tuples for the WHERE clause.
+    :param params: A tuple of parameter values matching the placeholders in conditions.
+    :param in_column: The column used for the IN clause.
+    :param in_values: A tuple of values for the IN clause. The IN clause is skipped if the first value is empty.
+    :param order_by: The column to order by, or 'None' to skip ORDER BY.
+    :param order_direction: The ORDER BY direction ('ASC' or 'DESC').
+    :param limit: The LIMIT value. LIMIT is skipped if it is not greater than 0.
+
+    Returns:
+    :return: A tuple containing the query string and a tuple of parameter values.
+    """
+    parts = ['SELECT ', 'DISTINCT ' if distinct else '', ', '.join(selected_columns), ' FROM ', table_name]
+
+    local_conditions = list(conditions)
+    params = list(params)
+
+    # Handle IN condition
+    if in_values and in_values[0]:  # Check if the first value is not empty
+        in_clause = ', '.join(['%s'] * len(in_values))
+        local_conditions.append((in_column, "IN", f"({in_clause})"))
+        params.extend(in_values)
+
+    # Construct the WHERE clause
+    if local_conditions:
+        parts.append(' WHERE ')
+        parts.append(" AND ".join(f"{col} {op} {val}" for col, op, val in local_conditions))
+
+    # Handle ORDER BY
+    if order_by != 'None':
+        parts.append(f" ORDER BY {order_by} {order_direction}")
+
+    # Handle LIMIT
+    if limit > 0:
+        parts.append(f" LIMIT {limit}")
+
+    query = ''.join(parts)
+    return query, tuple(params)
+
+
+def _is_number(value):
+    """
+    Returns whether the value can be converted to a float. Numbers and plain ASCII integer or decimal strings, the
+    common cases, are accepted without running the float parser, which remains the fallback for exponents, 'inf' and
+    other forms.
+    """
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        digits = value.strip()
+        if digits[:1] in ('+', '-'):
+            digits = digits[1:]
+        # isdigit alone would also accept characters such as superscripts, which float rejects
+        if digits.isascii() and digits.replace('.', '', 1).isdigit():
+            return True
+
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=32)
+def _split_in_values(values_str):
+    """
+    Splits a comma-separated IN clause string into a tuple of whitespace-stripped values. Memoized on the string, so
+    validating unchanged textarea contents again does not re-split it.
+    """
+    # Strip whitespace and split by comma
+    return tuple(val.strip() for val in values_str.split(','))
+
+
+def _match_units(param):
+    """
+    Returns the key of MAPPED_UNITS that the given query parameter names, either directly or through its event value,
+    or all keys if it names none.
+    """
+    if param in MAPPED_UNITS:
+        return (param,)
+    key = _UNIT_VALUE_TO_KEY.get(param)
+    return (key,) if key is not None else _UNIT_KEYS
+
+
+def _excel_cell(value):
+    """
+    Converts a DataFrame value into one xlsxwriter can write the way pandas' Excel writer does: missing values (None,
+    NaN, NaT and pd.NA) are left blank, infinities are written as 'inf' / '-inf' (to_excel's default inf_rep), NumPy
+    scalars are unwrapped, and containers such as host lists are written as their string form.
+    """
+    if isinstance(value, (list, tuple, dict, set, np.ndarray)):
+        return str(value)
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic) and not isinstance(value, (np.datetime64, np.timedelta64)):
+        value = value.item()
+    if isinstance(value, float) and np.isinf(value):
+        return 'inf' if value > 0 else '-inf'
+    return value
+
+
+def _write_excel(df, output, sheet_name='Sheet1'):
+    """
+    Writes a DataFrame, including its index, to an .xlsx workbook one row at a time using xlsxwriter's constant_memory
+    mode, so each row is flushed to disk as soon as the next one starts instead of the whole sheet being held in
+    memory. pandas' to_excel cannot be used for this because it writes cells column by column, and constant_memory
+    discards any cell written to a row that has already been flushed.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'remove_timezone': True,
+                                            'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, [df.index.name] + [str(col) for col in df.columns])
+        for row_number, row in enumerate(df.itertuples(name=None), start=1):
+            worksheet.write_row(row_number, 0, [_excel_cell(value) for value in row])
+    finally:
+        workbook.close()
 
 
 class DataProcessor:
     def __init__(self, base_widget_manager):
         self.base_widget_manager = base_widget_manager
+        # metric -> (de-duplicated values, standardized float32 values), valid for the DataFrame in _corr_source
+        self._corr_cache = {}
+        self._corr_source = None
+        # (metric -> row, correlation matrix) for the metrics that share one set of timestamps
+        self._corr_matrix = None
+        # metric -> standardized float32 ranks for Spearman correlation
+        self._rank_cache = {}
+        # (method, sorted metric pair) -> (correlation, p-value) for pairs already calculated
+        self._corr_results = {}
+        # column -> validator used by validate_condition_jobs / validate_condition_hosts
+        self._job_validators = {
+            'jid': self.validate_jid,
+            'account': self.validate_account,
+            'username': self.validate_username,
+            'host_list': self.validate_host_list,
+            'jobname': self.validate_jobname
+        }
+        self._job_numeric = frozenset({'ncores', 'ngpus', 'nhosts', 'timelimit'})
+        self._host_validators = {
+            'event': self.validate_event,
+            'host': self.validate_host,
+            'jid': self.validate_jid,
+            'unit': self.validate_unit,
+            'value': self.validate_value
+        }
 
     def remove_special_chars(self, s: str) -> str:
         """
@@ -20,13 +214,11 @@ class DataProcessor:
         Returns:
         :return str: A string where all characters that are not letters, numbers, or commas have been removed.
         """
-        # This pattern matches any character that is NOT a letter, number, or a comma
-        pattern = r'[^a-zA-Z0-9,]'
-
-        # Substitute all matches with an empty string
-        cleaned_str = re.sub(pattern, '', s)
-
-        return cleaned_str
+        # Delete any character that is NOT a letter, number, or a comma. ASCII input, the usual case, goes through a
+        # precomputed translation table; anything else falls back to the regex, which also removes non-ASCII letters
+        if s.isascii():
+            return s.translate(_SPECIAL_CHARS_TABLE)
+        return _SPECIAL_CHARS_RE.sub('', s)
 
     def validate_jid(self, value):
         """
@@ -39,12 +231,9 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the job id.
                  Returns None if the value is valid.
         """
-        jobs = value.split(',')
-        for job in jobs:
-            job = job.strip().upper()  # Remove any leading or trailing whitespace
-            if not re.match(r'^JOB\d+$', job):
-                return "Error: For 'jid', value must be a comma-separated list of strings starting with 'JOB' " \
-                       "followed by one or more digits."
+        if not _JID_LIST_RE.match(value):
+            return "Error: For 'jid', value must be a comma-separated list of strings starting with 'JOB' " \
+                   "followed by one or more digits."
         return None
 
     def validate_numeric_columns(self, column, value):
@@ -60,9 +249,8 @@ class DataProcessor:
         :return: An error message string if the value cannot be converted to a float.
                  Returns None if the value is valid.
         """
-        try:
-            float(value)  # Check if the value can be converted to a float (including integers and decimals)
-        except ValueError:
+        # Check if the value can be converted to a float (including integers and decimals)
+        if not _is_number(value):
             return f"Error: For '{column}', value must be a number (including decimals)."
         return None
 
@@ -77,12 +265,9 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the account.
                  Returns None if the value is valid.
         """
-        groups = value.split(',')
-        for group in groups:
-            group = group.strip().upper()  # Remove any leading or trailing whitespace
-            if not re.match(r'^GROUP\d+$', group):
-                return "Error: For 'account', value must be a comma-separated list of strings starting with " \
-                       "'GROUP' followed by one or more digits."
+        if not _GROUP_LIST_RE.match(value):
+            return "Error: For 'account', value must be a comma-separated list of strings starting with " \
+                   "'GROUP' followed by one or more digits."
         return None
 
     def validate_username(self, value):
@@ -97,12 +282,9 @@ class DataProcessor:
                  Returns None if the value is valid.
         """
 
-        users = value.split(',')
-        for user in users:
-            user = user.strip().upper()  # Remove any leading or trailing whitespace
-            if not re.match(r'^USER\d+$', user):
-                return "Error: For 'username', value must be a comma-separated list of strings starting with " \
-                       "'USER' followed by one or more digits."
+        if not _USER_LIST_RE.match(value):
+            return "Error: For 'username', value must be a comma-separated list of strings starting with " \
+                   "'USER' followed by one or more digits."
         return None
 
     def validate_host_list(self, value):
@@ -116,12 +298,9 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the host list.
                  Returns None if the value is valid.
         """
-        hosts = value.split(',')
-        for host in hosts:
-            host = host.strip().upper()  # Remove any leading or trailing whitespace
-            if not re.match(r'^NODE\d+$', host):
-                return "Error: For 'host_list', value must be a comma-separated list of strings starting with " \
-                       "'NODE' followed by one or more digits."
+        if not _NODE_LIST_RE.match(value):
+            return "Error: For 'host_list', value must be a comma-separated list of strings starting with " \
+                   "'NODE' followed by one or more digits."
         return None
 
     def validate_jobname(self, value):
@@ -135,12 +314,9 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the jobname.
                  Returns None if the value is valid.
         """
-        jobs = value.split(',')
-        for job in jobs:
-            job = job.strip().upper()  # Remove any leading or trailing whitespace
-            if not re.match(r'^JOBNAME\d+$', job):
-                return "Error: For job name, value must be a comma-separated list of strings starting with " \
-                       "'JOBNAME' followed by one or more digits."
+        if not _JOBNAME_LIST_RE.match(value):
+            return "Error: For job name, value must be a comma-separated list of strings starting with " \
+                   "'JOBNAME' followed by one or more digits."
         return None
 
     def validate_condition_jobs(self, column, value):
@@ -158,20 +334,12 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the specified column.
                  Returns None if the value is valid.
         """
-        error_message = None
-        if column == 'jid':
-            error_message = self.validate_jid(value)
-        elif column in ['ncores', 'ngpus', 'nhosts', 'timelimit']:
-            error_message = self.validate_numeric_columns(column, value)
-        elif column == 'account':
-            error_message = self.validate_account(value)
-        elif column == 'username':
-            error_message = self.validate_username(value)
-        elif column == 'host_list':
-            error_message = self.validate_host_list(value)
-        elif column == 'jobname':
-            error_message = self.validate_jobname(value)
-        return error_message
+        validator = self._job_validators.get(column)
+        if validator is not None:
+            return validator(value)
+        if column in self._job_numeric:
+            return self.validate_numeric_columns(column, value)
+        return None
 
     # Validate condition
     def validate_condition_hosts(self, column, value):
@@ -188,18 +356,10 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the specified column.
                  Returns None if the value is valid.
         """
-        error_message = None
-        if column == 'event':
-            error_message = self.validate_event(value)
-        elif column == 'host':
-            error_message = self.validate_host(value)
-        elif column == 'jid':
-            error_message = self.validate_jid(value)
-        elif column == 'unit':
-            error_message = self.validate_unit(value)
-        elif column == 'value':
-            error_message = self.validate_value(value)
-        return error_message
+        validator = self._host_validators.get(column)
+        if validator is not None:
+            return validator(value)
+        return None
 
     def validate_event(self, value):
         """
@@ -212,7 +372,7 @@ class DataProcessor:
         :return: An error message string if the value is not in the predefined list for the event.
                  Returns None if the value is valid.
         """
-        if value not in ['cpuuser', 'block', 'memused', 'memused_minus_diskcache', 'gpu_usage', 'nfs']:
+        if value not in _VALID_EVENTS:
             return "Error: For 'event', value must be one of: cpuuser, block, memused, memused_minus_diskcache, " \
                    "gpu_usage, nfs."
         return None
@@ -228,12 +388,9 @@ class DataProcessor:
         :return: An error message string if the value does not adhere to the predefined format for the host.
                  Returns None if the value is valid.
         """
-        hosts = value.split(',')
-        for host in hosts:
-            host = host.strip().upper()  # Remove any leading or trailing whitespace
-            if not re.match(r'^NODE\d+$', host):
-                return "Error: For 'host', value must be a comma-separated list of strings starting with 'NODE' " \
-                       "followed by one or more digits."
+        if not _NODE_LIST_RE.match(value):
+            return "Error: For 'host', value must be a comma-separated list of strings starting with 'NODE' " \
+                   "followed by one or more digits."
         return None
 
     def validate_unit(self, value):
@@ -247,7 +404,7 @@ class DataProcessor:
         :return: An error message string if the value is not in the predefined list for the unit.
                  Returns None if the value is valid.
         """
-        if value not in ['CPU %', 'GPU %', 'GB:memused', 'GB:memused_minus_diskcache', 'GB/s', 'MB/s']:
+        if value not in _VALID_UNITS:
             return "Error: For 'unit', value must be one of: 'CPU %', 'GPU %', 'GB:memused', 'GB:memused_minus_diskcache', 'GB/s', 'MB/s'."
         return None
 
@@ -262,9 +419,7 @@ class DataProcessor:
         :return: An error message string if the value cannot be converted to a float.
                  Returns None if the value is valid.
         """
-        try:
-            float(value)
-        except ValueError:
+        if not _is_number(value):
             return "Error: For 'value', the value must be a number."
         return None
 
@@ -278,54 +433,34 @@ class DataProcessor:
         Returns:
         - list: A list of parsed values.
         """
-        # Strip whitespace and split by comma
-        values = [val.strip() for val in values_str.split(',')]
-        return values
+        return list(_split_in_values(values_str))
 
     def construct_query_hosts(self, where_conditions_hosts, host_data_columns_dropdown, validate_button_hosts,
                               start_time_hosts, end_time_hosts):
-        selected_columns = ', '.join(host_data_columns_dropdown)
-        table_name = 'host_data'
+        bwm = self.base_widget_manager
 
-        # Handle DISTINCT
-        if self.base_widget_manager.distinct_checkbox.value:
-            query = f"SELECT DISTINCT {selected_columns} FROM {table_name}"
-        else:
-            query = f"SELECT {selected_columns} FROM {table_name}"
-
-        # Initialize params and local conditions list
-        params = []
-        local_conditions = where_conditions_hosts.copy()  # Start with the conditions passed in
-
-        # Add the values from where_conditions_values to params
-        params.extend(self.base_widget_manager.where_conditions_values)
+        # Start with the conditions passed in and the values from where_conditions_values
+        conditions = list(where_conditions_hosts)
+        params = list(bwm.where_conditions_values)
 
         # Handle time validation
         if validate_button_hosts == "Times Valid":
-            local_conditions.append(("time", "BETWEEN", "%s AND %s"))
+            conditions.append(("time", "BETWEEN", "%s AND %s"))
             params.extend([start_time_hosts, end_time_hosts])
 
-        # Handle IN condition
-        in_values = [value.strip() for value in self.base_widget_manager.in_values_textarea.value.split(',')]
-        if in_values and in_values[0]:  # Check if the first value is not empty
-            in_clause = ', '.join(['%s'] * len(in_values))
-            local_conditions.append((self.base_widget_manager.in_values_dropdown.value, "IN", f"({in_clause})"))
-            params.extend(in_values)
-
-        # Construct the WHERE clause
-        if local_conditions:
-            where_clause = " AND ".join([f"{col} {op} {val}" for col, op, val in local_conditions])
-            query += f" WHERE {where_clause}"
-
-        # Handle ORDER BY
-        if self.base_widget_manager.order_by_dropdown.value != 'None':
-            query += f" ORDER BY {self.base_widget_manager.order_by_dropdown.value} {self.base_widget_manager.order_by_direction_dropdown.value}"
-
-        # Handle LIMIT
-        if self.base_widget_manager.limit_input.value > 0:
-            query += f" LIMIT {self.base_widget_manager.limit_input.value}"
-
-        return query, params
+        query, params = _build_select_query(
+            'host_data',
+            tuple(host_data_columns_dropdown),
+            bwm.distinct_checkbox.value,
+            tuple(conditions),
+            tuple(params),
+            bwm.in_values_dropdown.value,
+            bwm.parsed_in_values_hosts,
+            bwm.order_by_dropdown.value,
+            bwm.order_by_direction_dropdown.value,
+            bwm.limit_input.value
+        )
+        return query, list(params)
 
     def construct_job_data_query(self, where_conditions_jobs, job_data_columns_dropdown, validate_button_jobs,
                                  start_time_jobs,
@@ -357,47 +492,34 @@ class DataProcessor:
         if not all(column in valid_columns for column in selected_columns):
             raise ValueError("Invalid column name selected")
 
-        selected_columns_str = ', '.join(selected_columns)
-        table_name = 'job_data'
-
-        if self.base_widget_manager.distinct_checkbox_jobs.value:
-            query = f"SELECT DISTINCT {selected_columns_str} FROM {table_name}"
-        else:
-            query = f"SELECT {selected_columns_str} FROM {table_name}"
-
-        # Initialize params and local conditions list
+        # Use %s placeholders for the condition values and pass the values as params, in a single pass
+        conditions = []
         params = []
-        local_conditions = [(col, op, "%s") for col, op, _ in where_conditions_jobs]
-
-        # Extract values and add to params
-        params.extend([val for _, _, val in where_conditions_jobs])
+        append_condition = conditions.append
+        append_param = params.append
+        for col, op, val in where_conditions_jobs:
+            append_condition((col, op, "%s"))
+            append_param(val)
 
         # Handle time validation
         if validate_button_jobs == "Times Valid":
-            local_conditions.append(("start_time", "BETWEEN", "%s AND %s"))
+            conditions.append(("start_time", "BETWEEN", "%s AND %s"))
             params.extend([start_time_jobs, end_time_jobs])
 
-        # Handle IN condition
-        in_values = [value.strip() for value in self.base_widget_manager.in_values_textarea_jobs.value.split(',')]
-        if in_values and in_values[0]:  # Check if the first value is not empty
-            in_clause = ', '.join(['%s'] * len(in_values))
-            local_conditions.append((self.base_widget_manager.in_values_dropdown_jobs.value, "IN", f"({in_clause})"))
-            params.extend(in_values)
-
-        # Construct the WHERE clause
-        if local_conditions:
-            where_clause = " AND ".join([f"{col} {op} {val}" for col, op, val in local_conditions])
-            query += f" WHERE {where_clause}"
-
-        # Handle ORDER BY
-        if self.base_widget_manager.order_by_dropdown_jobs.value != 'None':
-            query += f" ORDER BY {self.base_widget_manager.order_by_dropdown_jobs.value} {self.base_widget_manager.order_by_direction_dropdown_jobs.value}"
-
-        # Handle LIMIT
-        if self.base_widget_manager.limit_input_jobs.value > 0:
-            query += f" LIMIT {self.base_widget_manager.limit_input_jobs.value}"
-
-        return query, params
+        bwm = self.base_widget_manager
+        query, params = _build_select_query(
+            'job_data',
+            tuple(selected_columns),
+            bwm.distinct_checkbox_jobs.value,
+            tuple(conditions),
+            tuple(params),
+            bwm.in_values_dropdown_jobs.value,
+            bwm.parsed_in_values_jobs,
+            bwm.order_by_dropdown_jobs.value,
+            bwm.order_by_direction_dropdown_jobs.value,
+            bwm.limit_input_jobs.value
+        )
+        return query, list(params)
 
     def get_mean(self, time_series: pd.DataFrame, rolling=False, window=None) -> pd.DataFrame:
         """
@@ -418,13 +540,12 @@ class DataProcessor:
                  DataFrame. If rolling is set to True, the result will be a DataFrame with the rolling window median. If
                  rolling is False, the result will be a Series with the overall median.
         """
-        result = time_series.copy()
-        result.drop(['jid', 'host', 'event', 'unit'], axis=1, inplace=True)
-
+        # Only the 'value' column is reduced, so select it instead of copying the frame and dropping the rest
         if rolling:
-            return result.rolling(window=window).mean()
+            return time_series[['value']].rolling(window=window).mean()
 
-        return result.mean()
+        # Reduce the column directly, without materialising a one-column frame first
+        return pd.Series({'value': time_series['value'].mean()})
 
     def get_median(self, time_series: pd.DataFrame, rolling=False, window=None) -> pd.DataFrame:
         """
@@ -445,13 +566,12 @@ class DataProcessor:
                  DataFrame. If rolling is set to True, the result will be a DataFrame with the rolling window median. If
                  rolling is False, the result will be a Series with the overall median.
         """
-        result = time_series.copy()
-        result.drop(['jid', 'host', 'event', 'unit'], axis=1, inplace=True)
-
+        # Only the 'value' column is reduced, so select it instead of copying the frame and dropping the rest
         if rolling:
-            return result.rolling(window=window).median()
+            return time_series[['value']].rolling(window=window).median()
 
-        return result.median()
+        # Reduce the column directly, without materialising a one-column frame first
+        return pd.Series({'value': time_series['value'].median()})
 
     def get_standard_deviation(self, time_series: pd.DataFrame, rolling=False, window=None) -> pd.DataFrame:
         """
@@ -472,13 +592,12 @@ class DataProcessor:
                 time_series DataFrame. If rolling is set to True, the result will be a DataFrame with the rolling window
                 standard deviation. If rolling is False, the result will be a Series with the overall standard deviation.
         """
-        result = time_series.copy()
-        result.drop(['jid', 'host', 'event', 'unit'], axis=1, inplace=True)
-
+        # Only the 'value' column is reduced, so select it instead of copying the frame and dropping the rest
         if rolling:
-            return result.rolling(window=window).std()
+            return time_series[['value']].rolling(window=window).std()
 
-        return result.std()
+        # Reduce the column directly, without materialising a one-column frame first
+        return pd.Series({'value': time_series['value'].std()})
 
     def remove_columns(self):
         """
@@ -490,66 +609,66 @@ class DataProcessor:
        Returns:
        :return: A pandas DataFrame with the specified columns removed.
        """
-        if not isinstance(self.base_widget_manager.time_series_df, pd.DataFrame):
+        time_series_df = self.base_widget_manager.time_series_df
+        if not isinstance(time_series_df, pd.DataFrame):
             raise ValueError("Input must be a pandas DataFrame.")
 
-        columns_to_remove = ['type', 'diff', 'arc']
+        # errors='ignore' already skips columns that are not present, so the drop itself cannot fail
+        time_series_df.drop(columns=['type', 'diff', 'arc'], errors='ignore', inplace=True)
 
-        try:
-            self.base_widget_manager.time_series_df.drop(columns=columns_to_remove, errors='ignore', inplace=True)
-        except Exception as e:
-            raise RuntimeError(f"An error occurred while removing columns: {e}")
-
-    def create_csv_download_file(self, df, filename="data.csv"):
+    def create_csv_download_file(self, df, filename="data.csv", compresslevel=1):
         """
         Saves a DataFrame as a zipped CSV file to the current working directory.
 
         Parameters:
         :param df: A pandas DataFrame that is to be saved.
         :param filename: The name to use for the saved file inside the zip. Defaults to "data.csv".
+        :param compresslevel: The DEFLATE level (0-9) to compress the CSV with. Defaults to 1, which keeps most of the
+        size reduction of higher levels for a fraction of the CPU time.
 
         Returns:
         :return: A message indicating the file's location or an error message.
         """
         try:
-            # Convert DataFrame to CSV string
-            csv_str = df.to_csv(index=False)
-            csv_bytes = csv_str.encode('utf-8')
-
             # Define zip filename
             zip_filename = filename.rsplit('.', 1)[0] + '.zip'
             zip_path = os.path.join(os.getcwd(), zip_filename)
 
-            # Write the CSV data to a zip file
-            with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
-                zipf.writestr(filename, csv_bytes)
+            # Stream the CSV straight into the zip member rather than building the whole CSV string and its encoded
+            # bytes in memory first
+            with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED,
+                                 compresslevel=compresslevel) as zipf:
+                with zipf.open(filename, 'w', force_zip64=True) as member:
+                    with io.TextIOWrapper(member, encoding='utf-8', newline='') as csv_file:
+                        df.to_csv(csv_file, index=False)
 
             return f"File saved to {zip_path}"
         except Exception as e:
             return f"An error occurred: {e}"
 
-    def create_excel_download_file(self, df, filename="data.xlsx"):
+    def create_excel_download_file(self, df, filename="data.xlsx", compresslevel=None):
         """
         Saves a DataFrame as a zipped Excel (.xlsx) file to the current working directory.
 
         Parameters:
         :param df: A pandas DataFrame that is to be saved.
         :param filename: The name to use for the saved file inside the zip. Defaults to "data.xlsx".
+        :param compresslevel: The DEFLATE level (0-9) to compress the workbook with. Defaults to None, which stores it
+        uncompressed since an .xlsx file is already a compressed zip archive.
 
         Returns:
         :return: A message indicating the file's location or an error message.
         """
         try:
-            df_copy = df.copy()
-
-            # If df has datetime columns, convert them to timezone-naive
-            for col in df.columns:
-                if isinstance(df[col].dtype, pd.DatetimeTZDtype):
-                    df_copy[col] = df[col].dt.tz_convert(None)
+            # If df has timezone-aware datetime columns, convert them to timezone-naive on a copy
+            tz_columns = df.select_dtypes(include=['datetimetz']).columns
+            df_copy = df.copy() if len(tz_columns) else df
+            for col in tz_columns:
+                df_copy[col] = df[col].dt.tz_convert(None)
 
             # Write DataFrame to Excel in memory
             with io.BytesIO() as output:
-                df_copy.to_excel(output, engine='xlsxwriter', sheet_name='Sheet1')
+                _write_excel(df_copy, output)
                 excel_data = output.getvalue()
 
             # Define zip filename
@@ -557,60 +676,217 @@ class DataProcessor:
             zip_path = os.path.join(os.getcwd(), zip_filename)
 
             # Write the Excel data to a zip file
-            with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
+            compression = zipfile.ZIP_STORED if compresslevel is None else zipfile.ZIP_DEFLATED
+            with zipfile.ZipFile(zip_path, 'w', compression=compression, compresslevel=compresslevel) as zipf:
                 zipf.writestr(filename, excel_data)
 
             return f"File saved to {zip_path}"
         except Exception as e:
             return f"An error occurred: {e}"
 
-    def calculate_correlation(self, time_series: pd.DataFrame, correlations):
+    def calculate_correlation(self, time_series: pd.DataFrame, correlations, method='pearson'):
         """
-        Calculate the Pearson Correlation Coefficient between two time series.
+        Calculate the Pearson or Spearman Correlation Coefficient between two time series.
 
         Parameters:
         time_series: A pandas DataFrame that contains a column 'value'.
         correlations: A tuple of two elements, each representing the metric to be used for correlation calculation.
+        method: 'pearson' for the Pearson coefficient or 'spearman' for the Spearman rank coefficient.
 
         Returns:
-        A dictionary containing the Pearson Correlation Coefficient and p-value, or None if calculation was not possible.
+        A dictionary containing the Correlation Coefficient and p-value, or None if calculation was not possible.
         """
         metric_one, metric_two = correlations
 
-        ts_metric_one = time_series[time_series['event'] == metric_one]
-        ts_metric_one = ts_metric_one[~ts_metric_one.index.duplicated(keep='first')]
+        # The coefficient is symmetric, so revisiting a pair in either order is a lookup
+        self._check_correlation_source(time_series)
+        result_key = (method,) + tuple(sorted(correlations))
+        cached = self._corr_results.get(result_key)
+        if cached is not None:
+            correlation, p_val = cached
+            return {"Correlation": correlation, "P-value": p_val, "Metric One": metric_one, "Metric Two": metric_two}
 
-        ts_metric_two = time_series[time_series['event'] == metric_two]
-        ts_metric_two = ts_metric_two[~ts_metric_two.index.duplicated(keep='first')]
+        values_one = self._correlation_vectors(time_series, metric_one)[0]
+        values_two = self._correlation_vectors(time_series, metric_two)[0]
 
         # Check for sufficient data
         insufficient_data = []
-        if len(ts_metric_one) < 2:
+        if len(values_one) < 2:
             insufficient_data.append(metric_one)
-        if len(ts_metric_two) < 2:
+        if len(values_two) < 2:
             insufficient_data.append(metric_two)
 
         if insufficient_data:
             print(f"Insufficient data for {', '.join(insufficient_data)}")
             return None
 
-        # Find common timestamps using index intersection
-        common_timestamps = ts_metric_one.index.intersection(ts_metric_two.index)
+        if values_one.index.equals(values_two.index):
+            n = len(values_one)
+            if method == 'spearman':
+                # The cached ranks line up directly, so the rank coefficient is a single dot product
+                ranks_one = self._rank_vectors(time_series, metric_one)
+                ranks_two = self._rank_vectors(time_series, metric_two)
+                correlation = float(np.clip(np.dot(ranks_one, ranks_two), -1.0, 1.0))
+            else:
+                # Both metrics were sampled at the same timestamps, so the coefficient comes from the all-pairs matrix
+                rows, matrix = self._correlation_matrix(time_series, metric_one)
+                if metric_two in rows:
+                    correlation = float(matrix[rows[metric_one], rows[metric_two]])
+                else:
+                    # Metrics outside MAPPED_UNITS are not in the matrix, so use their cached standardized vectors
+                    standardized_one = self._correlation_vectors(time_series, metric_one)[1]
+                    standardized_two = self._correlation_vectors(time_series, metric_two)[1]
+                    correlation = float(np.clip(np.dot(standardized_one, standardized_two), -1.0, 1.0))
+        else:
+            # Align both metrics on their common timestamps in a single inner join
+            aligned = pd.concat([values_one, values_two], axis=1, join='inner').to_numpy(dtype=np.float64)
+            metric_one_values = aligned[:, 0]
+            metric_two_values = aligned[:, 1]
+
+            # Check for at least 2 data points
+            if len(aligned) < 2:
+                print('Both time series need to have at least 2 data points to calculate correlation.')
+                return None
+
+            n = len(metric_one_values)
+            if method == 'spearman':
+                correlation = pearson(rankdata(metric_one_values), rankdata(metric_two_values))
+            else:
+                correlation = pearson(metric_one_values, metric_two_values)
+
+        if method == 'spearman':
+            p_val = spearman_p_value(correlation, n)
+        else:
+            p_val = pearson_p_value(correlation, n)
 
-        metric_one_values = ts_metric_one.loc[common_timestamps, 'value'].values
-        metric_two_values = ts_metric_two.loc[common_timestamps, 'value'].values
+        self._corr_results[result_key] = (correlation, p_val)
+        return {"Correlation": correlation, "P-value": p_val, "Metric One": metric_one, "Metric Two": metric_two}
 
-        # Check for same length and at least 2 data points
-        if len(metric_one_values) != len(metric_two_values):
-            print(f'The two metrics do not have the same amount of sampling in the data.')
-            return None
-        elif len(metric_one_values) < 2 or len(metric_two_values) < 2:
-            print('Both time series need to have at least 2 data points to calculate correlation.')
-            return None
+    def calculate_correlations(self, time_series: pd.DataFrame, pairs, method='pearson'):
+        """
+        Calculate the Pearson or Spearman Correlation Coefficient for several metric pairs of the same time series. Every
+        metric sampled on the same timestamps is standardized once, and for Pearson the coefficients of all such pairs
+        come from one correlation matrix product, so a sweep over many pairs costs little more than a single pair.
 
-        correlation, p_val = pearsonr(metric_one_values, metric_two_values)
+        Parameters:
+        time_series: A pandas DataFrame that contains a column 'value'.
+        pairs: An iterable of tuples of two metrics each, as passed to calculate_correlation.
+        method: 'pearson' for the Pearson coefficient or 'spearman' for the Spearman rank coefficient.
 
-        return {"Correlation": correlation, "P-value": p_val, "Metric One": metric_one, "Metric Two": metric_two}
+        Returns:
+        A list with the calculate_correlation result of each pair, in the order the pairs were given.
+        """
+        pairs = list(pairs)
+        if method == 'pearson' and pairs:
+            # Build the shared matrix up front from the first metric that has enough data
+            for metric in dict.fromkeys(metric for pair in pairs for metric in pair):
+                if len(self._correlation_vectors(time_series, metric)[0]) >= 2:
+                    self._correlation_matrix(time_series, metric)
+                    break
+
+        return [self.calculate_correlation(time_series, pair, method=method) for pair in pairs]
+
+    def prepare_correlation(self, time_series: pd.DataFrame):
+        """
+        Builds the cached correlation vectors for every host metric, and the correlation matrix of the first metric that
+        has data, ahead of time so that the first correlation request is served from the cache.
+
+        Parameters:
+        :param time_series: A pandas DataFrame with 'event' and 'value' columns.
+        """
+        if 'event' not in time_series.columns:
+            return
+
+        for event in MAPPED_UNITS.values():
+            if len(self._correlation_vectors(time_series, event)[0]) >= 2 and self._corr_matrix is None:
+                self._correlation_matrix(time_series, event)
+
+    def _check_correlation_source(self, time_series: pd.DataFrame):
+        """
+        Drops every cached correlation vector, matrix and result when the time series differs from the one they were
+        calculated from.
+        """
+        if self._corr_source is not time_series:
+            self._corr_cache = {}
+            self._corr_matrix = None
+            self._rank_cache = {}
+            self._corr_results = {}
+            self._corr_source = time_series
+
+    def _correlation_vectors(self, time_series: pd.DataFrame, metric):
+        """
+        Returns one metric's values from the time series, de-duplicated by timestamp, along with the standardized values.
+        Results are cached per metric until a different DataFrame is passed in, so switching between metric pairs does
+        not filter the full table or re-standardize the values again.
+
+        Parameters:
+        :param time_series: A pandas DataFrame with 'event' and 'value' columns.
+        :param metric: The event name to extract.
+
+        Returns:
+        :return: A tuple of the values Series and the standardized values as a contiguous float32 ndarray (NaN for a
+                 constant series).
+        """
+        self._check_correlation_source(time_series)
+
+        cached = self._corr_cache.get(metric)
+        if cached is None:
+            ts_metric = time_series[time_series['event'] == metric]
+            values = ts_metric.loc[~ts_metric.index.duplicated(keep='first'), 'value']
+
+            cached = (values, standardize(values.to_numpy(dtype=np.float64)))
+            self._corr_cache[metric] = cached
+        return cached
+
+    def _rank_vectors(self, time_series: pd.DataFrame, metric):
+        """
+        Returns the standardized average ranks of one metric's de-duplicated values. The ranks are computed once per
+        metric and cached alongside the values from _correlation_vectors.
+
+        Parameters:
+        :param time_series: A pandas DataFrame with 'event' and 'value' columns.
+        :param metric: The event name to rank.
+
+        Returns:
+        :return: The standardized ranks as a contiguous float32 ndarray.
+        """
+        values = self._correlation_vectors(time_series, metric)[0]
+        cached = self._rank_cache.get(metric)
+        if cached is None:
+            cached = standardize(rankdata(values.to_numpy(dtype=np.float64)))
+            self._rank_cache[metric] = cached
+        return cached
+
+    def _correlation_matrix(self, time_series: pd.DataFrame, metric):
+        """
+        Returns the Pearson correlation matrix of every metric sampled on the same timestamps as the given metric. The
+        matrix is computed with a single product of the standardized columns and cached, so any later pair drawn from
+        the same metrics is a lookup.
+
+        Parameters:
+        :param time_series: A pandas DataFrame with 'event' and 'value' columns.
+        :param metric: The event name whose timestamps the other metrics must share.
+
+        Returns:
+        :return: A tuple of a dictionary mapping each included metric to its row and the correlation matrix.
+        """
+        if self._corr_matrix is not None and metric in self._corr_matrix[0]:
+            return self._corr_matrix
+
+        index = self._correlation_vectors(time_series, metric)[0].index
+        rows = {}
+        columns = []
+        for event in dict.fromkeys((metric,) + tuple(MAPPED_UNITS.values())):
+            values, standardized = self._correlation_vectors(time_series, event)
+            if values.index.equals(index):
+                rows[event] = len(columns)
+                columns.append(standardized)
+
+        stacked = np.column_stack(columns)
+        matrix = np.clip(stacked.T @ stacked, -1.0, 1.0)
+
+        self._corr_matrix = (rows, matrix)
+        return self._corr_matrix
 
     def parse_host_data_query(self, host_sql):
         """
@@ -623,32 +899,14 @@ class DataProcessor:
                  query's parameters. If no matches are found or an error occurs, it returns all the keys from the
                  mapped_units dictionary.
         """
-        mapped_units = {
-            "CPU %": "cpuuser",
-            "GPU %": "gpu_usage",
-            "GB:memused": "memused",
-            "GB:memused_minus_diskcache": "memused_minus_diskcache",
-            "GB/s": "block",
-            "MB/s": "nfs"
-        }
         if not isinstance(host_sql, tuple) or len(host_sql) < 2:
-            return list(mapped_units.keys())
+            return list(MAPPED_UNITS.keys())
 
         _, params = host_sql
 
-        matched_keywords = []
-
         try:
             # Check the unit value in params (params[0])
-            for key, value in mapped_units.items():
-                if params[0] == key or params[0] == value:
-                    matched_keywords.append(key)
-
-            # If no matches are found, return all the keys from the mapped_units
-            if not matched_keywords:
-                return list(mapped_units.keys())
-
-            return matched_keywords
+            return list(_match_units(params[0]))
         except Exception as e:
             print(f"An error occurred: {e}")
-            return list(mapped_units.keys())
+            return list(MAPPED_UNITS.keys())
@@ -0,0 +1,53 @@
+import asyncio
+import contextlib
+import functools
+
+
+def debounce(wait, output=None):
+    """
+    Decorator that postpones calls to the wrapped function until `wait` seconds have passed without another call, so a
+    burst of widget events results in a single trailing call made with the most recent arguments. Calls are debounced
+    separately for each first argument, so every instance of a decorated method has its own pending call. The delay is
+    scheduled on the kernel's running asyncio event loop; when no loop is running (e.g. a plain Python script) the
+    function is called immediately.
+
+    A delayed call runs from the event loop rather than from a cell, so an exception it raises would only reach the
+    kernel log. Instead it is caught and printed, into the Output widget given by `output` if there is one.
+
+    Parameters:
+    :param wait: The quiet period in seconds that must elapse before the wrapped function runs.
+    :param output: Optional. A function that takes the wrapped function's first argument (e.g. self) and returns the
+                   ipywidgets Output widget that the delayed call's output and errors are shown in.
+
+    Returns:
+    :return: A decorator that wraps a function with the debouncing behaviour.
+    """
+    def decorator(fn):
+        # First argument's id -> the handle of its scheduled call
+        pending = {}
+
+        def run(key, args, kwargs):
+            pending.pop(key, None)
+            target = output(args[0]) if output is not None and args else contextlib.nullcontext()
+            with target:
+                try:
+                    fn(*args, **kwargs)
+                except Exception as e:
+                    print(f"An error occurred: {e}")
+
+        @functools.wraps(fn)
+        def debounced(*args, **kwargs):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return fn(*args, **kwargs)
+
+            key = id(args[0]) if args else None
+            handle = pending.get(key)
+            if handle is not None:
+                handle.cancel()
+            pending[key] = loop.call_later(wait, run, key, args, kwargs)
+
+        return debounced
+
+    return decorator
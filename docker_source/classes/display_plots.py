@@ -1,10 +1,87 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
 from tqdm import tqdm
 import ipywidgets as widgets
 from IPython.display import display
 
+# Rolling statistics computed directly on a shared pandas Rolling object
+ROLLING_STAT_METHODS = {
+    "Mean": "mean",
+    "Median": "median",
+    "Standard Deviation": "std"
+}
+
+# Line plots with more points than this are reduced to about DOWNSAMPLE_POINTS before drawing; an 8-inch axes is well
+# under 1000 pixels wide, so the extra vertices would only be drawn on top of each other
+DOWNSAMPLE_THRESHOLD = 4000
+DOWNSAMPLE_POINTS = 2000
+
+
+def _minmax_downsample(values, n_out=DOWNSAMPLE_POINTS):
+    """
+    Selects the positions of the points to draw for a line plot, keeping the first and last points and the minimum and
+    maximum of each of n_out / 2 equal-width buckets, so peaks and troughs survive the reduction.
+
+    Parameters:
+    :param values: A 1-D float ndarray of y values, which may contain NaN.
+    :param n_out: The approximate number of points to keep.
+
+    Returns:
+    :return: A sorted ndarray of positions into values.
+    """
+    n = len(values)
+    if n <= DOWNSAMPLE_THRESHOLD:
+        return np.arange(n)
+
+    n_buckets = max(n_out // 2, 1)
+    bucket_size = -(-n // n_buckets)
+    # Pad to a whole number of buckets; padding and NaN never win the min/max comparison
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(n_buckets, bucket_size)
+    nan_mask = np.isnan(padded)
+    offsets = np.arange(n_buckets) * bucket_size
+    min_idx = offsets + np.where(nan_mask, np.inf, padded).argmin(axis=1)
+    max_idx = offsets + np.where(nan_mask, -np.inf, padded).argmax(axis=1)
+
+    idx = np.unique(np.concatenate(([0, n - 1], min_idx, max_idx)))
+    return idx[idx < n]
+
+
+def _parse_times(times):
+    """
+    Parses a column of timestamps, trying the ISO 8601 format the database and exports produce first so pandas doesn't
+    have to infer a format, and falling back to inference for anything else.
+
+    Parameters:
+    :param times: A pandas Series of timestamp strings or objects.
+
+    Returns:
+    :return: The parsed timestamps as a datetime64 Series.
+    """
+    try:
+        return pd.to_datetime(times, format='ISO8601', cache=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(times, cache=True)
+
+
+def _format_time_axis(ax, index):
+    """
+    Labels a datetime x-axis with matplotlib's concise date formatter, which keeps the tick labels short enough to stay
+    horizontal, instead of rotating them with fig.autofmt_xdate and relaying out the whole figure.
+
+    Parameters:
+    :param ax: The Axes whose x-axis to format.
+    :param index: The index the plotted x values came from; non-datetime indexes are left with the default formatter.
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        locator = AutoDateLocator(tz=index.tz)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(ConciseDateFormatter(locator, tz=index.tz))
+
 
 class DataProcessor(ABC):
     @abstractmethod
@@ -42,13 +119,33 @@ class PlottingService(ABC):
         pass
 
     @abstractmethod
-    def conditionally_display_legend(self):
+    def conditionally_display_legend(self, ax=None):
         pass
 
 
 class DisplayPlots:
+    # Statistic name -> (service attribute, method name), resolved against the instance when a statistic is drawn
+    METRIC_DISPATCH = {
+        "Mean": ("data_processor", "get_mean"),
+        "Median": ("data_processor", "get_median"),
+        "Standard Deviation": ("data_processor", "get_standard_deviation"),
+        "PDF": ("plotting_service", "plot_pdf"),
+        "CDF": ("plotting_service", "plot_cdf"),
+        "Ratio of Data Outside Threshold": ("plotting_service", "plot_data_points_outside_threshold")
+    }
+
+    # Unit label -> event name stored in the host data 'event' column
+    UNIT_MAP = {
+        "CPU %": "cpuuser",
+        "GPU %": "gpu_usage",
+        "GB:memused": "memused",
+        "GB:memused_minus_diskcache": "memused_minus_diskcache",
+        "GB/s": "block",
+        "MB/s": "nfs"
+    }
+
     def __init__(self, time_series_df, data_processor, plotting_service, host_data_sql_query, stats, interval_type,
-                 time_value, time_units, ratio_threshold):
+                 time_value, time_units, ratio_threshold, cache=None):
         self.time_series_df = time_series_df
         self.data_processor = data_processor
         self.plotting_service = plotting_service
@@ -58,194 +155,301 @@ class DisplayPlots:
         self.time_value = time_value
         self.time_units = time_units
         self.ratio_threshold = ratio_threshold
+        self._line_figure = None
+        # Work derived from time_series_df that later renders of the same DataFrame can reuse: 'source' (the DataFrame
+        # it was derived from), 'prepared' (the time-indexed copy), 'event_groups' (event -> rows) and 'stat_values'
+        # ((event, statistic) -> value). The caller owns the dictionary and decides how long it lives.
+        self.cache = {} if cache is None else cache
+        if self.cache.get('source') is not time_series_df:
+            self.cache.clear()
+            self.cache['source'] = time_series_df
 
     def display_plots(self):
         try:
-            ts_df = self.time_series_df.copy()
-            try:
-                ts_df['time'] = pd.to_datetime(ts_df['time'])
-                ts_df = ts_df.set_index('time')
-                ts_df = ts_df.sort_index()
-            except Exception as e:
-                print("")
+            # Nothing to draw for the default 'None' selection, so skip the time series preparation entirely
+            stat_vals = tuple(stat for stat in self.stats.value if stat and stat != 'None')
+            if not stat_vals:
+                print("Select at least one statistic.")
+                return
+
+            # Read each widget value once; the helpers below use these snapshots instead of the widget traits
+            self.selected_stats = stat_vals
+            self.selected_interval_type = self.interval_type.value
+            self.selected_time_units = self.time_units.value
+            self.selected_time_value = self.time_value.value
+            self.selected_ratio_threshold = self.ratio_threshold.value
+
+            ts_df = self._prepare_time_series()
 
-            metric_func_map = {
-                "Mean": self.data_processor.get_mean,
-                "Median": self.data_processor.get_median,
-                "Standard Deviation": self.data_processor.get_standard_deviation,
-                "PDF": self.plotting_service.plot_pdf,
-                "CDF": self.plotting_service.plot_cdf,
-                "Ratio of Data Outside Threshold": self.plotting_service.plot_data_points_outside_threshold
-            }
-
-            unit_map = {
-                "CPU %": "cpuuser",
-                "GPU %": "gpu_usage",
-                "GB:memused": "memused",
-                "GB:memused_minus_diskcache": "memused_minus_diskcache",
-                "GB/s": "block",
-                "MB/s": "nfs"
-            }
+            unit_map = self.UNIT_MAP
+
+            if 'event' not in ts_df.columns:
+                print("ERROR: Please make sure to run the previous notebook cells before executing this one.")
+                return
+
+            event_groups = self._group_events(ts_df)
 
             units = self.data_processor.parse_host_data_query(self.host_data_sql_query)
 
-            total_operations = len(units) * len(self.stats.value)
+            total_operations = len(units) * len(self.selected_stats)
 
-            # Create the progress bar
+            # Create the progress bar, coalescing updates to roughly 20 redraws regardless of the workload
             pbar = tqdm(total=total_operations,
                         desc="Generating chart/s",
+                        mininterval=0.3,
+                        miniters=max(1, total_operations // 20),
                         bar_format='{desc}: {percentage:.1f}%|{bar}| {n}/{total} [Elapsed: {elapsed} | '
                                    'Remaining: {remaining} | {rate_fmt}{postfix}]')
 
-            tab = widgets.Tab()
-            outputs = self._initialize_outputs(units)
-
-            self._set_tab_children(tab, outputs, units)
+            tab, outputs = self._build_tab(units)
 
-            with plt.style.context('fivethirtyeight'):
-                unit_stat_dfs = self._calculate_unit_stats(ts_df, units, unit_map, metric_func_map, outputs, pbar)
-                self._plot_box_and_whisker(units, unit_stat_dfs, outputs, ts_df, unit_map)
+            unit_stat_dfs = self._calculate_unit_stats(ts_df, event_groups, units, unit_map, outputs, pbar)
+            self._plot_box_and_whisker(units, unit_stat_dfs, outputs, ts_df, event_groups, unit_map)
 
+            pbar.refresh()
             pbar.close()
             display(tab)
+            return tab
         except NameError as e:
             print("ERROR: Please make sure to run the previous notebook cells before executing this one.")
 
-    def _initialize_outputs(self, units):
-        outputs = {}
-        basic_stats = ['Mean', 'Median', 'Standard Deviation']
-
-        for unit in units:
-            outputs[unit] = {}
-            if any(stat in self.stats.value for stat in basic_stats):
-                for stat in self.stats.value + ('Box and Whisker',):
-                    outputs[unit][stat] = widgets.Output()
-            else:
-                for stat in self.stats.value:
-                    outputs[unit][stat] = widgets.Output()
-
-        return outputs
+    def _prepare_time_series(self):
+        """
+        Returns the time series indexed and sorted by its 'time' column, with 'event' stored as a categorical. The result
+        is kept in the render cache, so rendering the same query results again skips the datetime parse, the sort and
+        the categorical conversion.
+        """
+        if 'prepared' in self.cache:
+            return self.cache['prepared']
+
+        ts_df = self.time_series_df
+        if not isinstance(ts_df.index, pd.DatetimeIndex) and 'time' in ts_df.columns:
+            try:
+                if not pd.api.types.is_datetime64_any_dtype(ts_df['time']):
+                    ts_df = ts_df.assign(time=_parse_times(ts_df['time']))
+                ts_df = ts_df.set_index('time', drop=True)
+                # Query results usually arrive in time order already; a stable sort keeps rows that share a
+                # timestamp in their original order
+                if not ts_df.index.is_monotonic_increasing:
+                    ts_df = ts_df.sort_index(kind='stable')
+            except Exception as e:
+                print("")
 
-    def _set_tab_children(self, tab, outputs, units):
+        # Group on integer category codes rather than hashing every event string
+        if 'event' in ts_df.columns and not isinstance(ts_df['event'].dtype, pd.CategoricalDtype):
+            event_dtype = pd.CategoricalDtype(categories=list(self.UNIT_MAP.values()))
+            ts_df = ts_df.assign(event=ts_df['event'].astype(event_dtype))
+
+        self.cache['prepared'] = ts_df
+        return ts_df
+
+    def _group_events(self, ts_df):
+        """
+        Partitions the time series by event once so each unit's rows are a dictionary lookup. The partition is kept in
+        the render cache along with the prepared time series, so rendering the same query results again skips the
+        groupby as well.
+        """
+        if 'event_groups' not in self.cache:
+            self.cache['event_groups'] = {name: group for name, group in
+                                          ts_df.groupby('event', sort=False, observed=True)}
+        return self.cache['event_groups']
+
+    def _build_tab(self, units):
+        """
+        Builds the output widgets and the tab of per-unit accordions in a single pass over the units.
+
+        Returns:
+        :return: A tuple of the Tab widget and a dictionary mapping each unit and statistic to its Output widget.
+        """
         basic_stats = ['Mean', 'Median', 'Standard Deviation']
+        stat_titles = self.selected_stats
+        if any(stat in stat_titles for stat in basic_stats):
+            stat_titles += ('Box and Whisker',)
 
-        if any(stat in self.stats.value for stat in basic_stats):
-            tab.children = [widgets.Accordion([widgets.Box([widgets.Label(stat), outputs[unit][stat]]) for stat in
-                                               self.stats.value + ('Box and Whisker',)],
-                                              titles=self.stats.value + ('Box and Whisker',)) for unit in units]
-        else:
-            tab.children = [
-                widgets.Accordion(
-                    [widgets.Box([widgets.Label(stat), outputs[unit][stat]]) for stat in self.stats.value],
-                    titles=self.stats.value) for unit in units]
+        outputs = {}
+        accordions = []
+        for unit in units:
+            outputs[unit] = {stat: widgets.Output() for stat in stat_titles}
+            accordions.append(widgets.Accordion(
+                [widgets.Box([widgets.Label(stat), outputs[unit][stat]]) for stat in stat_titles],
+                titles=stat_titles))
 
+        tab = widgets.Tab()
+        tab.children = accordions
         tab.titles = units
+        return tab, outputs
 
-    def _calculate_unit_stats(self, ts_df, units, unit_map, metric_func_map, outputs, pbar):
+    def _calculate_unit_stats(self, ts_df, event_groups, units, unit_map, outputs, pbar):
         unit_stat_dfs = {}
         time_map = {'Days': 'D', 'Hours': 'H', 'Minutes': 'T', 'Seconds': 'S'}
 
+        rolling = False
+        if self.selected_interval_type == "Time":
+            rolling = True
+            try:
+                window = f"{self.selected_time_value}{time_map[self.selected_time_units]}"
+            except KeyError:
+                print("Error! Please ensure a selection was made in the 'Interval Unit' dropdown.")
+        elif self.selected_interval_type == "Count":
+            rolling = True
+            window = self.selected_time_value
+
         for unit in units:
             unit_stat_dfs[unit] = {}
-            for metric in self.stats.value:
-                metric_df = ts_df.query(f"`event` == '{unit_map[unit]}'")
-                rolling = False
-
-                if self.interval_type.value == "Time":
-                    rolling = True
-                    try:
-                        window = f"{self.time_value.value}{time_map[self.time_units.value]}"
-                    except KeyError:
-                        print("Error! Please ensure a selection was made in the 'Interval Unit' dropdown.")
-                elif self.interval_type.value == "Count":
-                    rolling = True
-                    window = self.time_value.value
-
+            metric_df = event_groups.get(unit_map[unit], ts_df.iloc[:0])
+            rolling_values = None
+            for metric in self.selected_stats:
                 if metric in ["PDF", "CDF", "Ratio of Data Outside Threshold"]:
                     with outputs[unit][metric]:
-                        unit_stat_dfs[unit][metric] = self._handle_special_cases(metric, metric_func_map, metric_df)
+                        unit_stat_dfs[unit][metric] = self._handle_special_cases(metric, metric_df)
                     continue
 
                 pbar.update(1)
 
                 if rolling:
-                    unit_stat_dfs[unit][metric] = metric_func_map[metric](metric_df, rolling=True, window=window)
+                    if metric in ROLLING_STAT_METHODS:
+                        # Build the rolling window once per unit and reuse it for mean, median and std
+                        if rolling_values is None:
+                            rolling_values = metric_df['value'].rolling(window=window)
+                        stat_series = getattr(rolling_values, ROLLING_STAT_METHODS[metric])()
+                        unit_stat_dfs[unit][metric] = stat_series.to_frame()
+                    else:
+                        unit_stat_dfs[unit][metric] = self._metric_func(metric)(metric_df, rolling=True, window=window)
                     self._plot_rolling_stats(unit, metric, unit_stat_dfs, outputs)
                 else:
                     self._plot_entire_metric(unit, metric, metric_df, outputs)
 
         return unit_stat_dfs
 
-    def _handle_special_cases(self, metric, metric_func_map, metric_df):
+    def _metric_func(self, metric):
+        service_name, method_name = self.METRIC_DISPATCH[metric]
+        return getattr(getattr(self, service_name), method_name)
+
+    def _handle_special_cases(self, metric, metric_df):
         if metric == "PDF":
-            return metric_func_map[metric](metric_df)
+            return self._metric_func(metric)(metric_df)
         elif metric == "CDF":
-            return metric_func_map[metric](metric_df)
+            return self._metric_func(metric)(metric_df)
         elif metric == "Ratio of Data Outside Threshold":
-            return metric_func_map[metric](self.ratio_threshold.value, metric_df)
+            return self._metric_func(metric)(self.selected_ratio_threshold, metric_df)
 
     def _plot_rolling_stats(self, unit, metric, unit_stat_dfs, outputs):
         with outputs[unit][metric]:
-            unit_stat_dfs[unit][metric].plot()
+            stat_df = unit_stat_dfs[unit][metric]
+            values = stat_df['value'].to_numpy(dtype=float, na_value=np.nan)
+            idx = _minmax_downsample(values)
+            fig, ax = self._line_axes()
+            ax.plot(stat_df.index[idx], values[idx], label='value')
             x_axis_label = ""
-            if self.interval_type.value == "Count":
-                x_axis_label += f"Count - Rolling Window: {self.time_value.value} Rows"
-            elif self.interval_type.value == "Time":
-                x_axis_label += f"Timestamp - Rolling Window: {self.time_value.value}{self.time_units.value}"
+            if self.selected_interval_type == "Count":
+                x_axis_label += f"Count - Rolling Window: {self.selected_time_value} Rows"
+            elif self.selected_interval_type == "Time":
+                x_axis_label += f"Timestamp - Rolling Window: {self.selected_time_value}{self.selected_time_units}"
             y_axis_label = unit
-            plt.gcf().autofmt_xdate()
-            plt.style.use('fivethirtyeight')
-            plt.title(f"{unit} {metric}")
-            self.plotting_service.conditionally_display_legend()
-            plt.xlabel(x_axis_label)
-            plt.ylabel(y_axis_label)
-            plt.show()
+            _format_time_axis(ax, stat_df.index)
+            ax.set_title(f"{unit} {metric}")
+            self.plotting_service.conditionally_display_legend(ax)
+            ax.set_xlabel(x_axis_label)
+            ax.set_ylabel(y_axis_label)
+            display(fig)
 
     def _plot_entire_metric(self, unit, metric, metric_df, outputs):
         with outputs[unit][metric]:
-            metric_df['value'].plot()
-            plt.gcf().autofmt_xdate()
-            plt.style.use('fivethirtyeight')
-            plt.title(f"{unit} {metric} Over Time")
-            plt.xlabel("Timestamp")
-            plt.ylabel(unit)
-
-            stat_value = self._calculate_stat_value(metric, metric_df)
+            values = metric_df['value'].to_numpy(dtype=float, na_value=np.nan)
+            idx = _minmax_downsample(values)
+            fig, ax = self._line_axes()
+            ax.plot(metric_df.index[idx], values[idx])
+            _format_time_axis(ax, metric_df.index)
+            ax.set_title(f"{unit} {metric} Over Time")
+            ax.set_xlabel("Timestamp")
+            ax.set_ylabel(unit)
+
+            stat_value = self._cached_stat_value(self.UNIT_MAP[unit], metric, values)
             if stat_value is not None:
                 annotation_text = f"{metric}: {stat_value:.2f}"
-                plt.annotate(annotation_text, xy=(0.05, 0.95), xycoords='axes fraction', fontsize=10,
-                             verticalalignment='top', bbox=dict(boxstyle="square", facecolor="white"))
-
-            plt.show()
-
-    def _calculate_stat_value(self, metric, metric_df):
-        if metric == "Mean":
-            return metric_df['value'].mean()
-        elif metric == "Median":
-            return metric_df['value'].median()
-        elif metric == "Standard Deviation":
-            return metric_df['value'].std()
-        else:
+                ax.annotate(annotation_text, xy=(0.05, 0.95), xycoords='axes fraction', fontsize=10,
+                            verticalalignment='top', bbox=dict(boxstyle="square", facecolor="white"))
+
+            display(fig)
+
+    def _line_axes(self):
+        """
+        Returns the figure and cleared axes that every line plot of this render is drawn on. display() renders the
+        figure to an image straight away, so one figure and canvas can be reused for every unit and statistic instead
+        of being created and destroyed for each plot.
+
+        Returns:
+        :return: A tuple of the Figure and its Axes.
+        """
+        if self._line_figure is None:
+            fig, ax = plt.subplots(figsize=(8, 4))
+            # Detached from pyplot so the inline backend doesn't show it on its own and the figure registry doesn't grow
+            plt.close(fig)
+            self._line_figure = fig, ax
+        fig, ax = self._line_figure
+        ax.clear()
+        return fig, ax
+
+    def _cached_stat_value(self, event, metric, values):
+        """
+        Returns the statistic for one event's values, reusing the value calculated for the same event and statistic
+        while the grouped time series it came from is unchanged. The first miss for an event calculates every selected
+        summary statistic for it at once.
+        """
+        if metric not in ROLLING_STAT_METHODS:
             return None
 
-    def _plot_box_and_whisker(self, units, unit_stat_dfs, outputs, ts_df, unit_map):
+        stat_values = self.cache.setdefault('stat_values', {})
+        key = (event, metric)
+        if key not in stat_values:
+            for stat, value in self._calculate_stat_values(metric, values).items():
+                stat_values[(event, stat)] = value
+        return stat_values[key]
+
+    def _calculate_stat_values(self, metric, values):
+        """
+        Calculates the requested statistic together with the other selected mean, median and standard deviation of one
+        event's values. NaNs are dropped once for all of them, and the standard deviation reuses the mean, matching the
+        pandas Series defaults (std uses ddof=1). Empty or all-NaN input gives NaN.
+
+        Returns:
+        :return: A dictionary mapping each calculated statistic to its value as a float.
+        """
+        wanted = {stat for stat in ROLLING_STAT_METHODS if stat in self.selected_stats}
+        wanted.add(metric)
+
+        values = values[~np.isnan(values)]
+        n = values.size
+        stat_values = {}
+        mean = values.mean() if n else np.nan
+        if "Mean" in wanted:
+            stat_values["Mean"] = float(mean)
+        if "Median" in wanted:
+            stat_values["Median"] = float(np.median(values)) if n else np.nan
+        if "Standard Deviation" in wanted:
+            deviations = values - mean
+            stat_values["Standard Deviation"] = float(np.sqrt(np.dot(deviations, deviations) / (n - 1))) if n > 1 \
+                else np.nan
+        return stat_values
+
+    def _plot_box_and_whisker(self, units, unit_stat_dfs, outputs, ts_df, event_groups, unit_map):
+        want_mean = 'Mean' in self.selected_stats
+        want_std = 'Standard Deviation' in self.selected_stats
+        want_median = 'Median' in self.selected_stats
+
         for unit in units:
             df_mean = unit_stat_dfs[unit].get('Mean')
             df_std = unit_stat_dfs[unit].get('Standard Deviation')
             df_median = unit_stat_dfs[unit].get('Median')
 
-            if not any(df is not None for df in [df_mean, df_std, df_median]):
-                metric_df = ts_df.query(f"`event` == '{unit_map[unit]}'")
-                if 'Mean' in self.stats.value:
-                    df_mean = pd.DataFrame(metric_df['value'])
-                    df_mean.columns = ['value']
-                if 'Standard Deviation' in self.stats.value:
-                    df_std = pd.DataFrame(metric_df['value'])
-                    df_std.columns = ['value']
-                if 'Median' in self.stats.value:
-                    df_median = pd.DataFrame(metric_df['value'])
-                    df_median.columns = ['value']
-
-            if any(df is not None for df in [df_mean, df_std, df_median]):
+            if df_mean is None and df_std is None and df_median is None:
+                metric_df = event_groups.get(unit_map[unit], ts_df.iloc[:0])
+                # plot_box_and_whisker leaves its inputs untouched, so every selected statistic can share one frame
+                base_df = metric_df[['value']]
+                df_mean = base_df if want_mean else None
+                df_std = base_df if want_std else None
+                df_median = base_df if want_median else None
+
+            if df_mean is not None or df_std is not None or df_median is not None:
                 with outputs[unit]['Box and Whisker']:
                     self.plotting_service.plot_box_and_whisker(df_mean, df_std, df_median)
@@ -1,9 +1,26 @@
 from IPython.display import display, clear_output, HTML
+from classes.base_widget_manager import HOST_ORDER_OPTIONS, JOB_ORDER_OPTIONS
 from classes.database_manager import DatabaseManager
 from classes.data_processor import DataProcessor
+from classes.debounce import debounce
 from ipywidgets import widgets
 from datetime import datetime
 
+# Quiet periods for the observers that regenerate the displayed query: long enough to coalesce a burst of keystrokes
+# or spinner steps into one regeneration, short enough that the query still appears to follow the input
+QUERY_INPUT_DEBOUNCE = 0.2
+TEXT_INPUT_DEBOUNCE = 0.3
+
+
+def _hosts_query_output(manager):
+    """Returns the Output widget the host data query is displayed in, for errors raised by debounced observers."""
+    return manager.base_widget_manager.query_output_hosts
+
+
+def _jobs_query_output(manager):
+    """Returns the Output widget the job data query is displayed in, for errors raised by debounced observers."""
+    return manager.base_widget_manager.query_output_jobs
+
 
 class WidgetStateManager:
     def __init__(self, base_widget_manager):
@@ -17,13 +34,15 @@ class WidgetStateManager:
         # Observers
         self.base_widget_manager.columns_dropdown_hosts.observe(self.observer_columns_dropdown_hosts, names='value')
         self.base_widget_manager.distinct_checkbox.observe(self.observer_distinct_checkbox)
-        self.base_widget_manager.order_by_dropdown.observe(self.observer_order_by_dropdown)
-        self.base_widget_manager.order_by_direction_dropdown.observe(self.observer_order_by_dropdown)
+        # The debounced observers below only see 'value' changes, so the trailing call of a burst is never a
+        # different trait's change that they would ignore
+        self.base_widget_manager.order_by_dropdown.observe(self.observer_order_by_dropdown, names='value')
+        self.base_widget_manager.order_by_direction_dropdown.observe(self.observer_order_by_dropdown, names='value')
         self.base_widget_manager.host_data_columns_dropdown.observe(self.observer_host_data_columns_dropdown,
                                                                     names='value')
-        self.base_widget_manager.limit_input.observe(self.observe_limit_input)
-        self.base_widget_manager.in_values_dropdown.observe(self.observe_in_values_dropdown)
-        self.base_widget_manager.in_values_textarea.observe(self.observe_in_values_textarea)
+        self.base_widget_manager.limit_input.observe(self.observe_limit_input, names='value')
+        self.base_widget_manager.in_values_dropdown.observe(self.observe_in_values_dropdown, names='value')
+        self.base_widget_manager.in_values_textarea.observe(self.observe_in_values_textarea, names='value')
         # Button events
         self.base_widget_manager.validate_button_hosts.on_click(self.on_button_clicked_hosts)
         self.base_widget_manager.execute_button_hosts.on_click(self.on_execute_button_clicked_hosts)
@@ -39,11 +58,12 @@ class WidgetStateManager:
             self.observer_job_data_columns_dropdown, names='value'
         )
         self.base_widget_manager.distinct_checkbox_jobs.observe(self.on_distinct_hosts_checkbox_change)
-        self.base_widget_manager.order_by_dropdown_jobs.observe(self.observer_order_by_dropdowns)
-        self.base_widget_manager.order_by_direction_dropdown_jobs.observe(self.observer_order_by_dropdowns)
-        self.base_widget_manager.limit_input_jobs.observe(self.observer_limit_input_jobs)
-        self.base_widget_manager.in_values_dropdown_jobs.observe(self.observer_in_values_jobs)
-        self.base_widget_manager.in_values_textarea_jobs.observe(self.observer_in_values_jobs)
+        self.base_widget_manager.order_by_dropdown_jobs.observe(self.observer_order_by_dropdowns, names='value')
+        self.base_widget_manager.order_by_direction_dropdown_jobs.observe(self.observer_order_by_dropdowns,
+                                                                          names='value')
+        self.base_widget_manager.limit_input_jobs.observe(self.observer_limit_input_jobs, names='value')
+        self.base_widget_manager.in_values_dropdown_jobs.observe(self.observer_in_values_jobs, names='value')
+        self.base_widget_manager.in_values_textarea_jobs.observe(self.observer_in_values_jobs, names='value')
         # Button events
         self.base_widget_manager.validate_button_jobs.on_click(self.on_button_clicked_jobs)
         self.base_widget_manager.execute_button_jobs.on_click(self.on_execute_button_clicked_jobs)
@@ -73,9 +93,11 @@ class WidgetStateManager:
         if change['name'] == 'value':  # Check if the checkbox is checked
             self.base_widget_manager.display_query_hosts()
 
+    @debounce(QUERY_INPUT_DEBOUNCE, output=_jobs_query_output)
     def observer_order_by_dropdowns(self, change):
         self.base_widget_manager.display_query_jobs()
 
+    @debounce(QUERY_INPUT_DEBOUNCE, output=_hosts_query_output)
     def observer_order_by_dropdown(self, change):
         # Check if the change is due to a new value being selected in the dropdown
         if change['type'] == 'change' and change['name'] == 'value':
@@ -84,9 +106,8 @@ class WidgetStateManager:
 
     def observer_host_data_columns_dropdown(self, change):
         if '*' in self.base_widget_manager.host_data_columns_dropdown.value:
-            all_columns = ['None', 'host', 'jid', 'type', 'event', 'unit', 'value', 'diff', 'arc']
-            self.base_widget_manager.in_values_dropdown.options = all_columns
-            self.base_widget_manager.order_by_dropdown.options = all_columns
+            self.base_widget_manager.in_values_dropdown.options = HOST_ORDER_OPTIONS
+            self.base_widget_manager.order_by_dropdown.options = HOST_ORDER_OPTIONS
         else:
             # Set the selected columns as options for order_by_dropdown
             options = ['None'] + list(self.base_widget_manager.host_data_columns_dropdown.value)
@@ -94,26 +115,31 @@ class WidgetStateManager:
             self.base_widget_manager.in_values_dropdown.options = options
         self.base_widget_manager.display_query_hosts()
 
+    @debounce(QUERY_INPUT_DEBOUNCE, output=_hosts_query_output)
     def observe_limit_input(self, change):
         if change['name'] == 'value' and change['type'] == 'change':
             if self.base_widget_manager.limit_input.value > 0:
                 self.base_widget_manager.display_query_hosts()
 
+    @debounce(TEXT_INPUT_DEBOUNCE, output=_hosts_query_output)
     def observe_in_values_textarea(self, change):
         if change['name'] == 'value' and change['type'] == 'change':
             self.base_widget_manager.display_query_hosts()
 
+    @debounce(QUERY_INPUT_DEBOUNCE, output=_hosts_query_output)
     def observe_in_values_dropdown(self, change):
         if change['name'] == 'value' and change['type'] == 'change':
             val = self.base_widget_manager.in_values_dropdown.value
             if val != 'None':
                 self.base_widget_manager.display_query_hosts()
 
+    @debounce(QUERY_INPUT_DEBOUNCE, output=_jobs_query_output)
     def observer_limit_input_jobs(self, change):
         if change['name'] == 'value' and change['type'] == 'change':
             if self.base_widget_manager.limit_input_jobs.value > 0:
                 self.base_widget_manager.display_query_jobs()
 
+    @debounce(TEXT_INPUT_DEBOUNCE, output=_jobs_query_output)
     def observer_in_values_jobs(self, change):
         if change['name'] == 'value' and change['type'] == 'change':
             self.base_widget_manager.display_query_jobs()
@@ -158,10 +184,8 @@ class WidgetStateManager:
     def observer_job_data_columns_dropdown(self, change):
         # If * is selected, set all available columns as options
         if '*' in self.base_widget_manager.job_data_columns_dropdown.value:
-            all_job_cols = ['None'] + [col for col in self.base_widget_manager.job_data_columns_dropdown.options if
-                                       col != "*"]
-            self.base_widget_manager.order_by_dropdown_jobs.options = all_job_cols
-            self.base_widget_manager.in_values_dropdown_jobs.options = all_job_cols
+            self.base_widget_manager.order_by_dropdown_jobs.options = JOB_ORDER_OPTIONS
+            self.base_widget_manager.in_values_dropdown_jobs.options = JOB_ORDER_OPTIONS
         else:
             # Set the selected columns as options for order_by_dropdown
             options = ['None'] + list(self.base_widget_manager.job_data_columns_dropdown.value)
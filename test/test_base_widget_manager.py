@@ -0,0 +1,26 @@
+import unittest
+from classes.base_widget_manager import parse_in_values
+
+
+class ParseInValuesTests(unittest.TestCase):
+    def test_empty_or_blank_text(self):
+        for text in ('', '   ', '\n\t', None):
+            with self.subTest(text=text):
+                self.assertEqual(parse_in_values(text), ())
+
+    def test_values_are_trimmed(self):
+        self.assertEqual(parse_in_values(' NODE1, NODE2 ,NODE3 '), ('NODE1', 'NODE2', 'NODE3'))
+        self.assertEqual(parse_in_values('JOB1,\nJOB2'), ('JOB1', 'JOB2'))
+
+    def test_empty_values_are_dropped(self):
+        self.assertEqual(parse_in_values('a,,b, ,c,'), ('a', 'b', 'c'))
+        self.assertEqual(parse_in_values(','), ())
+
+    def test_matches_splitting_and_stripping(self):
+        text = ' user1 ,user2,  user3\t, user 4 '
+        expected = tuple(value.strip() for value in text.split(',') if value.strip())
+        self.assertEqual(parse_in_values(text), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
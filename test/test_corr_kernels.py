@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from scipy import stats
+from classes._corr_kernels import standardize, pearson, pearson_p_value, spearman_p_value
+
+
+class CorrKernelTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = rng.normal(10.0, 3.0, 500)
+        self.y = 0.3 * self.x + rng.normal(0.0, 3.0, 500)
+
+    def test_standardize_gives_unit_norm_float32(self):
+        standardized = standardize(self.x)
+        self.assertEqual(standardized.dtype, np.float32)
+        self.assertAlmostEqual(float(standardized.sum()), 0.0, places=4)
+        self.assertAlmostEqual(float(np.dot(standardized, standardized)), 1.0, places=5)
+
+    def test_standardize_constant_or_empty_is_nan(self):
+        self.assertTrue(np.isnan(standardize([2.0, 2.0, 2.0])).all())
+        self.assertEqual(standardize([]).size, 0)
+
+    def test_pearson_matches_scipy(self):
+        self.assertAlmostEqual(pearson(self.x, self.y), stats.pearsonr(self.x, self.y)[0], places=6)
+        self.assertAlmostEqual(pearson(self.x, -self.x), -1.0, places=6)
+        self.assertTrue(np.isnan(pearson(self.x, np.ones_like(self.x))))
+
+    def test_pearson_p_value_matches_scipy(self):
+        for n in (3, 10, 50, 500):
+            with self.subTest(n=n):
+                x, y = self.x[:n], self.y[:n]
+                r, expected = stats.pearsonr(x, y)
+                self.assertAlmostEqual(pearson_p_value(r, n), expected, places=10)
+        self.assertEqual(pearson_p_value(0.5, 2), 1.0)
+        self.assertTrue(np.isnan(pearson_p_value(np.nan, 10)))
+
+    def test_spearman_p_value_matches_scipy(self):
+        for n in (4, 10, 50, 500):
+            with self.subTest(n=n):
+                x, y = self.x[:n], self.y[:n]
+                r, expected = stats.spearmanr(x, y)
+                self.assertAlmostEqual(spearman_p_value(r, n), expected, places=10)
+        self.assertEqual(spearman_p_value(1.0, 10), 0.0)
+        self.assertTrue(np.isnan(spearman_p_value(np.nan, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+import numpy as np
+import pandas as pd
+from scipy import stats
+from classes.data_processor import DataProcessor, _excel_cell
+
+
+class ExcelCellTests(unittest.TestCase):
+    def test_missing_values_are_blank(self):
+        for value in (None, np.nan, np.float32('nan'), pd.NaT, pd.NA):
+            with self.subTest(value=value):
+                self.assertIsNone(_excel_cell(value))
+
+    def test_infinities_are_written_like_to_excel(self):
+        self.assertEqual(_excel_cell(np.inf), 'inf')
+        self.assertEqual(_excel_cell(-np.inf), '-inf')
+        self.assertEqual(_excel_cell(np.float32('-inf')), '-inf')
+
+    def test_numpy_scalars_are_unwrapped(self):
+        self.assertIs(type(_excel_cell(np.int64(3))), int)
+        self.assertIs(_excel_cell(np.bool_(True)), True)
+        self.assertEqual(_excel_cell(np.float32(1.5)), 1.5)
+
+    def test_containers_are_written_as_strings(self):
+        self.assertEqual(_excel_cell(['NODE1', 'NODE2']), "['NODE1', 'NODE2']")
+        self.assertEqual(_excel_cell(np.array([1, 2])), '[1 2]')
+
+
+@unittest.skipUnless(importlib.util.find_spec('xlsxwriter'), 'xlsxwriter is not installed')
+class ExcelDownloadTests(unittest.TestCase):
+    def test_nullable_and_infinite_values(self):
+        df = pd.DataFrame({
+            'value': [1.5, np.inf, -np.inf, np.nan],
+            'ncores': pd.array([1, None, 3, 4], dtype='Int64'),
+            'valid': pd.array([True, None, False, True], dtype='boolean'),
+            'host': pd.array(['NODE1', None, 'NODE3', 'NODE4'], dtype='string'),
+            'time': pd.to_datetime(['2023-01-01', None, '2023-01-02', '2023-01-03']).tz_localize('UTC'),
+        })
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                message = DataProcessor(None).create_excel_download_file(df)
+                self.assertTrue(message.startswith('File saved to'), message)
+                with zipfile.ZipFile(os.path.join(tmp, 'data.zip')) as zipf:
+                    self.assertEqual(zipf.namelist(), ['data.xlsx'])
+            finally:
+                os.chdir(cwd)
+
+
+class CorrelationTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        shared = pd.date_range('2023-01-01', periods=200, freq='min')
+        cpu = rng.normal(50.0, 10.0, 200)
+        self.values = {
+            'cpuuser': cpu,
+            'memused': 0.5 * cpu + rng.normal(0.0, 5.0, 200),
+            'nfs': rng.exponential(2.0, 200),
+        }
+        frames = [pd.DataFrame({'event': event, 'value': values}, index=shared)
+                  for event, values in self.values.items()]
+        # gpu_usage is only sampled on every other timestamp, so it must be aligned with the others first
+        frames.append(pd.DataFrame({'event': 'gpu_usage', 'value': rng.normal(20.0, 4.0, 100)}, index=shared[::2]))
+        self.time_series = pd.concat(frames)
+        self.gpu = frames[-1]['value'].to_numpy()
+
+    def test_pairs_on_shared_timestamps_match_scipy(self):
+        pairs = [('cpuuser', 'memused'), ('memused', 'nfs'), ('nfs', 'cpuuser')]
+        for method, reference in (('pearson', stats.pearsonr), ('spearman', stats.spearmanr)):
+            results = DataProcessor(None).calculate_correlations(self.time_series, pairs, method=method)
+            for (one, two), result in zip(pairs, results):
+                with self.subTest(method=method, pair=(one, two)):
+                    expected_r, expected_p = reference(self.values[one], self.values[two])
+                    self.assertAlmostEqual(result['Correlation'], expected_r, places=5)
+                    self.assertAlmostEqual(result['P-value'], expected_p, delta=1e-4 * max(expected_p, 1e-6))
+
+    def test_pair_on_different_timestamps_is_aligned(self):
+        result = DataProcessor(None).calculate_correlation(self.time_series, ('cpuuser', 'gpu_usage'))
+        expected_r, expected_p = stats.pearsonr(self.values['cpuuser'][::2], self.gpu)
+        self.assertAlmostEqual(result['Correlation'], expected_r, places=5)
+        self.assertAlmostEqual(result['P-value'], expected_p, places=4)
+
+    def test_metric_outside_the_matrix_after_it_is_built(self):
+        custom = np.random.default_rng(1).normal(0.0, 1.0, 200)
+        index = self.time_series.index[self.time_series['event'] == 'cpuuser']
+        time_series = pd.concat([self.time_series, pd.DataFrame({'event': 'custom_a', 'value': custom}, index=index)])
+        processor = DataProcessor(None)
+
+        # The first pair caches a matrix of the host metrics only, which custom_a is not one of
+        processor.calculate_correlation(time_series, ('cpuuser', 'memused'))
+        result = processor.calculate_correlation(time_series, ('cpuuser', 'custom_a'))
+        self.assertAlmostEqual(result['Correlation'], stats.pearsonr(self.values['cpuuser'], custom)[0], places=5)
+
+    def test_insufficient_data_returns_none(self):
+        with redirect_stdout(io.StringIO()):
+            self.assertIsNone(DataProcessor(None).calculate_correlation(self.time_series, ('cpuuser', 'block')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import datetime
+import io
+import re
+import unittest
+from collections import namedtuple
+from contextlib import contextmanager, redirect_stdout
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from classes.database_manager import DatabaseManager, _is_range_value
+
+Column = namedtuple('Column', 'name type_code')
+
+# {null} is replaced with the NULL marker the COPY statement asked for
+COPY_CSV = (b'time,host,value,ncores,valid,day\n'
+            b'2023-01-01 00:00:00+00,NA,1.5,3,t,2023-01-05\n'
+            b'2023-01-01 01:00:00-05,"",{null},{null},{null},{null}\n'
+            b'2023-01-01 02:00:00+00,null,2,4,f,2024-02-29\n'
+            b'2023-01-01 03:00:00+00,"\\N",3,5,t,2024-03-01\n')
+
+
+def mock_connection(description, copy_output=b''):
+    cur = MagicMock()
+    cur.description = description
+    cur.mogrify.side_effect = lambda query, params=None: query.encode()
+    cur.copy_expert.side_effect = lambda statement, buffer: buffer.write(
+        copy_output.replace(b'{null}', re.search(rb"NULL '([^']*)'", statement).group(1)))
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    return conn, cur
+
+
+class CopyQueryTests(unittest.TestCase):
+    def test_restores_read_sql_values_and_dtypes(self):
+        description = [Column('time', 1184), Column('host', 25), Column('value', 1700), Column('ncores', 20),
+                       Column('valid', 16), Column('day', 1082)]
+        conn, _ = mock_connection(description, COPY_CSV)
+
+        frame = DatabaseManager()._copy_query(conn, "SELECT * FROM host_data;")
+
+        self.assertEqual(str(frame['time'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(frame['time'][1], pd.Timestamp('2023-01-01 06:00:00', tz='UTC'))
+        # Text that looks like a missing value stays text; only NULL is missing
+        self.assertEqual(frame['host'].tolist(), ['NA', '', 'null', '\\N'])
+        self.assertEqual(frame['value'].dtype, 'float64')
+        self.assertTrue(pd.isna(frame['value'][1]))
+        self.assertEqual(frame['valid'].tolist(), [True, None, False, True])
+        self.assertEqual(frame['day'].tolist(), [datetime.date(2023, 1, 5), None, datetime.date(2024, 2, 29),
+                                               datetime.date(2024, 3, 1)])
+
+    def test_falls_back_to_read_sql_for_other_types(self):
+        conn, cur = mock_connection([Column('jid', 25), Column('runtime', 1186)])
+
+        with patch('classes.database_manager.pd.read_sql', return_value='read_sql result') as read_sql:
+            result = DatabaseManager()._copy_query(conn, "SELECT jid, runtime FROM job_data", ['JOB1'])
+
+        self.assertEqual(result, 'read_sql result')
+        read_sql.assert_called_once_with("SELECT jid, runtime FROM job_data", conn, params=['JOB1'])
+        cur.copy_expert.assert_not_called()
+
+
+class PartitionedQueryTests(unittest.TestCase):
+    def setUp(self):
+        self.conn, self.cur = mock_connection([])
+        self.manager = DatabaseManager()
+
+        @contextmanager
+        def get_database_connection(autocommit=False):
+            yield self.conn
+
+        self.manager.get_database_connection = get_database_connection
+        identifier = patch('classes.database_manager.sql.Identifier')
+        identifier.start().return_value.as_string.side_effect = lambda conn: '"col"'
+        self.addCleanup(identifier.stop)
+
+    def test_range_values(self):
+        self.assertTrue(_is_range_value(3))
+        self.assertTrue(_is_range_value(2.5))
+        self.assertTrue(_is_range_value(datetime.date(2023, 1, 1)))
+        self.assertTrue(_is_range_value(datetime.datetime(2023, 1, 1)))
+        self.assertFalse(_is_range_value('JOB1'))
+        self.assertFalse(_is_range_value(True))
+
+    def test_text_column_is_rejected_before_fetching(self):
+        self.cur.fetchone.return_value = ('JOB1', 'JOB9')
+        output = io.StringIO()
+        with redirect_stdout(output), patch.object(DatabaseManager, '_stream_query') as stream_query:
+            result = self.manager.execute_sql_query_partitioned("SELECT * FROM job_data", 'jid')
+
+        self.assertIsNone(result)
+        self.assertIn("Cannot partition on 'jid'", output.getvalue())
+        stream_query.assert_not_called()
+
+    def test_first_partition_includes_nulls(self):
+        self.cur.fetchone.return_value = (0, 100)
+        with patch.object(DatabaseManager, '_stream_query', return_value=pd.DataFrame({'col': [1]})) as stream_query:
+            result = self.manager.execute_sql_query_partitioned("SELECT * FROM host_data", 'col', n_parts=2)
+
+        self.assertEqual(len(result), 2)
+        queries = sorted(call.args[1] for call in stream_query.call_args_list)
+        self.assertTrue(queries[0].endswith('("col" >= %s AND "col" < %s) OR "col" IS NULL'))
+        self.assertTrue(queries[1].endswith('("col" >= %s AND "col" <= %s)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import io
+import unittest
+from contextlib import contextmanager, redirect_stdout
+from classes.debounce import debounce
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+        self.output_entered = 0
+
+    @contextmanager
+    def output(self):
+        self.output_entered += 1
+        yield
+
+    @debounce(0.01, output=lambda self: self.output())
+    def record(self, value):
+        self.calls.append(value)
+
+    @debounce(0.01, output=lambda self: self.output())
+    def fail(self):
+        raise ValueError("bad query")
+
+
+def run_async(coroutine):
+    return asyncio.run(coroutine())
+
+
+class DebounceTests(unittest.TestCase):
+    def test_called_immediately_without_an_event_loop(self):
+        recorder = Recorder()
+        recorder.record(1)
+        recorder.record(2)
+        self.assertEqual(recorder.calls, [1, 2])
+
+    def test_burst_results_in_one_trailing_call(self):
+        recorder = Recorder()
+
+        async def burst():
+            for value in range(5):
+                recorder.record(value)
+            await asyncio.sleep(0.05)
+
+        run_async(burst)
+        self.assertEqual(recorder.calls, [4])
+
+    def test_instances_are_debounced_separately(self):
+        first, second = Recorder(), Recorder()
+
+        async def interleaved():
+            first.record('a')
+            second.record('b')
+            await asyncio.sleep(0.05)
+
+        run_async(interleaved)
+        self.assertEqual(first.calls, ['a'])
+        self.assertEqual(second.calls, ['b'])
+
+    def test_errors_are_printed_into_the_output(self):
+        recorder = Recorder()
+        printed = io.StringIO()
+
+        async def failing():
+            recorder.fail()
+            await asyncio.sleep(0.05)
+
+        with redirect_stdout(printed):
+            run_async(failing)
+        self.assertEqual(recorder.output_entered, 1)
+        self.assertIn("An error occurred: bad query", printed.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
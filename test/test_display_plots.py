@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from classes.display_plots import DOWNSAMPLE_POINTS, DOWNSAMPLE_THRESHOLD, _minmax_downsample
+
+
+class MinMaxDownsampleTests(unittest.TestCase):
+    def test_short_series_are_kept_whole(self):
+        np.testing.assert_array_equal(_minmax_downsample(np.arange(10.0)), np.arange(10))
+        self.assertEqual(len(_minmax_downsample(np.zeros(DOWNSAMPLE_THRESHOLD))), DOWNSAMPLE_THRESHOLD)
+
+    def test_keeps_endpoints_and_extremes(self):
+        rng = np.random.default_rng(0)
+        for n in (DOWNSAMPLE_THRESHOLD + 1, 9999, 100000, 1000003):
+            with self.subTest(n=n):
+                values = rng.normal(size=n)
+                values[::7] = np.nan
+                idx = _minmax_downsample(values)
+                self.assertEqual(idx[0], 0)
+                self.assertEqual(idx[-1], n - 1)
+                self.assertTrue((np.diff(idx) > 0).all())
+                self.assertLessEqual(len(idx), DOWNSAMPLE_POINTS + 2)
+                self.assertEqual(np.nanmax(values[idx]), np.nanmax(values))
+                self.assertEqual(np.nanmin(values[idx]), np.nanmin(values))
+
+    def test_every_bucket_keeps_its_own_extremes(self):
+        n = 20000
+        values = np.sin(np.arange(n) / 50.0)
+        idx = _minmax_downsample(values)
+        bucket_size = -(-n // (DOWNSAMPLE_POINTS // 2))
+        for start in range(0, n, bucket_size):
+            bucket = values[start:start + bucket_size]
+            kept = values[idx[(idx >= start) & (idx < start + bucket_size)]]
+            self.assertEqual(kept.max(), bucket.max())
+            self.assertEqual(kept.min(), bucket.min())
+
+    def test_all_nan_series(self):
+        idx = _minmax_downsample(np.full(5000, np.nan))
+        self.assertTrue((idx < 5000).all())
+        self.assertEqual(idx[-1], 4999)
+
+
+if __name__ == '__main__':
+    unittest.main()